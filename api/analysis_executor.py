@@ -0,0 +1,17 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Analyses running at the same time per process; further submissions wait in the queue
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """Get the process-wide executor that runs analyses off the request (or Streamlit script) thread"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+        return _executor
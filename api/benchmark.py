@@ -0,0 +1,103 @@
+"""Offline end-to-end benchmark of the analysis pipeline using the stub LLM backend
+
+Usage:
+    python -m api.benchmark --runs 5 --files input_folder_1/kaztransoil_fake_data_raw.xlsx
+
+The API is served by uvicorn on a local port, so streaming timings include real SSE delivery.
+Requires httpx. Exits with status 1 if any run fails, so it can also be used as an offline
+regression check.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import statistics
+import threading
+
+# Must be set before the API modules are imported
+os.environ.setdefault("LLM_BACKEND", "stub")
+
+import httpx
+import uvicorn
+from api.main import app
+
+BENCHMARK_PORT = int(os.getenv("BENCHMARK_PORT", "8765"))
+
+def run_background_analysis(client: httpx.Client, prompt: str, file_paths: list) -> dict:
+    """Run one /api/analyze task and poll it to completion"""
+    start = time.perf_counter()
+    response = client.post("/api/analyze", json={"prompt": prompt, "file_paths": file_paths})
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+    while True:
+        task = client.get(f"/api/tasks/{task_id}").json()
+        if task["status"] in ("completed", "error"):
+            break
+        time.sleep(0.05)
+    return {"total": time.perf_counter() - start, "ok": task["status"] == "completed", "error": task.get("error")}
+
+def run_stream_analysis(client: httpx.Client, prompt: str, file_paths: list) -> dict:
+    """Run one /api/analyze/stream request and time its events"""
+    start = time.perf_counter()
+    first_output = None
+    events = 0
+    result = None
+    error = None
+    with client.stream("POST", "/api/analyze/stream", json={"prompt": prompt, "file_paths": file_paths}) as response:
+        for line in response.iter_lines():
+            if not line.startswith("data: "):
+                continue
+            events += 1
+            event = json.loads(line[len("data: "):])
+            if event["type"] == "output" and first_output is None:
+                first_output = time.perf_counter() - start
+            elif event["type"] == "result":
+                result = event["result"]
+            elif event["type"] == "error":
+                error = event["error"]
+    return {
+        "total": time.perf_counter() - start,
+        "first_output": first_output,
+        "events": events,
+        "ok": result is not None and bool(result.get("generated_files")),
+        "error": error
+    }
+
+def summarize(name: str, values: list):
+    values = [v for v in values if v is not None]
+    if not values:
+        return
+    print(f"  {name:<16} mean {statistics.mean(values):8.3f}s  p50 {statistics.median(values):8.3f}s  max {max(values):8.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline offline")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--files", nargs="*", default=None, help="Input files (default: all files in input_folder_1)")
+    parser.add_argument("--prompt", default="Посчитай итоги по каждому листу")
+    args = parser.parse_args()
+
+    file_paths = args.files or sorted(glob.glob(os.path.join("input_folder_1", "*.xlsx")))
+    failures = 0
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=BENCHMARK_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    with httpx.Client(base_url=f"http://127.0.0.1:{BENCHMARK_PORT}", timeout=None) as client:
+        for mode, runner in (("analyze", run_background_analysis), ("stream", run_stream_analysis)):
+            results = [runner(client, f"{args.prompt} #{run}", file_paths) for run in range(args.runs)]
+            print(f"{mode}: {sum(r['ok'] for r in results)}/{len(results)} ok")
+            summarize("total", [r["total"] for r in results])
+            summarize("first output", [r.get("first_output") for r in results])
+            for r in results:
+                if not r["ok"]:
+                    failures += 1
+                    print(f"  failed: {r['error']}")
+    server.should_exit = True
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import ast
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Characters of each cell's source kept in the record
+CELL_SOURCE_CHARS = int(os.getenv("CELL_SOURCE_CHARS", "2000"))
+# At most this many cells are recorded per run
+MAX_PROFILED_CELLS = 100
+# Cells shown in the "slowest cells" views
+SLOWEST_CELLS = 5
+
+_PROBE_MARKER = "__CELL_PROBE__"
+
+# Runs in the kernel before a cell: reset the peak RSS counter (Linux) and remember the CPU time
+PROBE_START_CODE = """
+import time as _probe_time
+try:
+    with open('/proc/self/clear_refs', 'w') as _probe_f:
+        _probe_f.write('5')
+except Exception:
+    pass
+_probe_cpu_start = _probe_time.process_time()
+"""
+
+# Runs in the kernel after a cell: CPU time, peak RSS and the size of the DataFrames the cell used
+PROBE_END_CODE = """
+import json as _probe_json
+def _cell_probe(names):
+    result = {"cpu_seconds": _probe_time.process_time() - _probe_cpu_start, "peak_memory_mb": None, "rows": None}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    result["peak_memory_mb"] = int(line.split()[1]) / 1024
+    except Exception:
+        import resource
+        result["peak_memory_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    rows = []
+    for name in names:
+        value = globals().get(name)
+        if hasattr(value, 'shape') and hasattr(value, 'iloc'):
+            rows.append(len(value))
+        elif name == 'sheets' and isinstance(value, dict):
+            rows.extend(len(df) for file_sheets in value.values() if isinstance(file_sheets, dict)
+                        for df in file_sheets.values() if hasattr(df, 'iloc'))
+    if rows:
+        result["rows"] = max(rows)
+    return result
+print(%r + _probe_json.dumps(_cell_probe(%r)))
+del _cell_probe
+"""
+
+def referenced_names(code: str) -> list:
+    """Names a cell reads or assigns (used to find the DataFrames it touched)"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    return sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)})
+
+def _parse_probe(output) -> dict:
+    for message in output or []:
+        content = str(message.get("content", ""))
+        if _PROBE_MARKER in content:
+            try:
+                return json.loads(content.split(_PROBE_MARKER, 1)[1].strip().splitlines()[0])
+            except (ValueError, IndexError):
+                return {}
+    return {}
+
+class CellProfiler:
+    """Records every code cell the interpreter runs: source, wall time, and for Python cells the kernel's
+    CPU time, peak memory (peak RSS of the kernel during the cell, Linux) and rows of the DataFrames it used
+    Only streamed runs are profiled, which is how Open Interpreter executes the model's code.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.cells = []
+        self._lock = threading.Lock()
+
+    def _probe(self, run, code: str) -> dict:
+        try:
+            return _parse_probe(run("python", code))
+        except Exception:
+            return {}
+
+    def _profiled_stream(self, run, language: str, code: str, chunks):
+        is_python = language == "python"
+        start = time.perf_counter()
+        try:
+            yield from chunks
+        finally:
+            wall_seconds = time.perf_counter() - start
+            record = {
+                "index": len(self.cells) + 1,
+                "language": language,
+                "source": code[:CELL_SOURCE_CHARS],
+                "wall_seconds": round(wall_seconds, 3),
+                "cpu_seconds": None,
+                "peak_memory_mb": None,
+                "rows": None
+            }
+            if is_python:
+                probe = self._probe(run, PROBE_END_CODE % (_PROBE_MARKER, referenced_names(code)))
+                if probe.get("cpu_seconds") is not None:
+                    record["cpu_seconds"] = round(probe["cpu_seconds"], 3)
+                if probe.get("peak_memory_mb") is not None:
+                    record["peak_memory_mb"] = round(probe["peak_memory_mb"], 1)
+                record["rows"] = probe.get("rows")
+            with self._lock:
+                if len(self.cells) < MAX_PROFILED_CELLS:
+                    self.cells.append(record)
+
+    @contextmanager
+    def attach(self):
+        """Profile cells run during the block by wrapping interpreter.computer.run"""
+        computer = self.interpreter.computer
+        previous = computer.__dict__.get("run")
+        original_run = computer.run
+
+        def profiled_run(language, code, *args, **kwargs):
+            if not kwargs.get("stream"):
+                return original_run(language, code, *args, **kwargs)
+            if language == "python":
+                self._probe(original_run, PROBE_START_CODE)
+            return self._profiled_stream(original_run, language, code, original_run(language, code, *args, **kwargs))
+
+        computer.run = profiled_run
+        try:
+            yield self
+        finally:
+            if computer.__dict__.get("run") is profiled_run:
+                if previous is None:
+                    del computer.run
+                else:
+                    computer.run = previous
+
+def slowest_cells(cells: list, count: int = SLOWEST_CELLS) -> list:
+    return sorted(cells or [], key=lambda cell: -(cell.get("wall_seconds") or 0))[:count]
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Bins of the precomputed histograms
+HISTOGRAM_BINS = int(os.getenv("HISTOGRAM_BINS", "40"))
+# Outliers kept per box plot (spread over the whole outlier range)
+MAX_BOX_OUTLIERS = 100
+# Points drawn in line/scatter views; longer series are downsampled with LTTB
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "2000"))
+
+def finite_values(series: pd.Series) -> np.ndarray:
+    """Values of a numeric column as float64, without NaN/Inf"""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+def histogram_bins(values: np.ndarray, bins: int = HISTOGRAM_BINS) -> dict:
+    """Counts per bin: {"edges": [bins + 1 edges], "counts": [bins counts]}, None for no values"""
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+def box_summary(values: np.ndarray, max_outliers: int = MAX_BOX_OUTLIERS) -> dict:
+    """Quartiles, whiskers (1.5 IQR) and a sample of the outliers, None for no values"""
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = np.sort(values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)])
+    if len(outliers) > max_outliers:
+        # Evenly spaced picks keep the most extreme values on both ends
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int)]
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "mean": float(values.mean()),
+        "lowerfence": float(inside.min()),
+        "upperfence": float(inside.max()),
+        "outlier_count": int(len(values) - len(inside)),
+        "outliers": outliers.tolist()
+    }
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int = CHART_MAX_POINTS):
+    """Downsample a series to threshold points with Largest-Triangle-Three-Buckets
+    Keeps the first and last point and, per bucket, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket, so peaks and dips survive.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return x[kept], y[kept]
+
+def row_series(series: pd.Series, max_points: int = CHART_MAX_POINTS) -> dict:
+    """Values of a column by row position, downsampled to at most max_points"""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    positions = np.flatnonzero(np.isfinite(values))
+    x, y = lttb(positions.astype(float), values[positions], max_points)
+    return {"x": x.astype(int).tolist(), "y": y.tolist(), "total_points": int(len(positions))}
@@ -0,0 +1,241 @@
+import os
+import ast
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from prometheus_client import Counter
+
+# "rewrite" (rewrite safe cases, hint the rest), "hint" (only hint) or "off"
+CODE_GUARD = os.getenv("CODE_GUARD", "rewrite")
+
+CODE_GUARD_HITS = Counter(
+    "code_guard_hits_total", "Slow pandas patterns found in generated code cells",
+    ["rule", "action"]
+)
+
+RULE_HINTS = {
+    "iterrows": "DataFrame.iterrows() is very slow on large frames. Use vectorized column operations "
+                "(df['a'] * df['b'], np.where, groupby) or at least itertuples().",
+    "row_apply": "apply(..., axis=1) calls Python once per row. Use vectorized column operations "
+                 "(df['a'] + df['b'], np.where(cond, x, y), Series.str / .dt methods) instead.",
+    "repeated_read": "The same file is read more than once. Read it once into a variable and reuse it.",
+    "preloaded_read": "This file is already loaded in memory as sheets[path][sheet_name]; do not read it again.",
+    "concat_in_loop": "pd.concat / append inside a loop copies all data on every iteration. Collect the pieces "
+                      "in a list and call pd.concat once after the loop.",
+}
+
+# Operators that give the same values and dtype on numpy scalars and on pandas Series
+# (// and % by zero give NaN on int Series but 0 on int64 scalars; ** raises for negative int exponents)
+_VECTOR_BINOPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+_VECTOR_UNARYOPS = (ast.USub, ast.UAdd)
+_VECTOR_CMPOPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_READ_FUNCTIONS = ("read_excel", "read_csv")
+
+def _is_simple_reference(node: ast.AST) -> bool:
+    """Names, attributes and constant subscripts, which can be evaluated twice without side effects"""
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _is_simple_reference(node.value)
+    if isinstance(node, ast.Subscript):
+        return _is_simple_reference(node.value) and isinstance(node.slice, (ast.Constant, ast.List))
+    return False
+
+def _is_row_column(node: ast.AST, row_name: str) -> bool:
+    return (isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == row_name
+            and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str))
+
+def _is_vectorizable(node: ast.AST, row_name: str) -> bool:
+    """Expression of row['column'] reads, numbers and arithmetic/single comparisons"""
+    if _is_row_column(node, row_name):
+        return True
+    if isinstance(node, ast.Constant):
+        # Small numbers only: larger ints overflow differently on int64 scalars and Series
+        return isinstance(node.value, (int, float)) and not isinstance(node.value, bool) and abs(node.value) < 2 ** 31
+    if isinstance(node, ast.BinOp):
+        return isinstance(node.op, _VECTOR_BINOPS) and _is_vectorizable(node.left, row_name) and _is_vectorizable(node.right, row_name)
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, _VECTOR_UNARYOPS) and _is_vectorizable(node.operand, row_name)
+    if isinstance(node, ast.Compare):
+        return (len(node.ops) == 1 and isinstance(node.ops[0], _VECTOR_CMPOPS)
+                and _is_vectorizable(node.left, row_name) and _is_vectorizable(node.comparators[0], row_name))
+    return False
+
+class _RowToFrame(ast.NodeTransformer):
+    """Replace row['column'] with frame['column']"""
+
+    def __init__(self, row_name: str, frame: ast.AST):
+        self.row_name = row_name
+        self.frame = frame
+
+    def visit_Subscript(self, node):
+        if _is_row_column(node, self.row_name):
+            return ast.Subscript(value=self.frame, slice=node.slice, ctx=ast.Load())
+        return self.generic_visit(node)
+
+def _vector_guard(frame_source: str) -> str:
+    """Runtime condition under which a row-wise apply and the vectorized expression give the same result:
+    a non-empty frame with unique columns that are all int64 or all float64 (no upcasting, no nullable dtypes)"""
+    return (f"len({frame_source}) and {frame_source}.columns.is_unique and {frame_source}.dtypes.nunique() == 1 "
+            f"and {frame_source}.dtypes.iloc[0] in ('int64', 'float64')")
+
+def _is_row_wise(call: ast.Call) -> bool:
+    for keyword in call.keywords:
+        if keyword.arg == "axis" and isinstance(keyword.value, ast.Constant) and keyword.value.value in (1, "columns"):
+            return True
+    return False
+
+def _replace_segments(code: str, edits: list) -> str:
+    """Apply (lineno, col, end_lineno, end_col, text) edits; columns are UTF-8 byte offsets as in ast"""
+    lines = code.splitlines(keepends=True)
+    for lineno, col, end_lineno, end_col, text in sorted(edits, reverse=True):
+        start_line = lines[lineno - 1].encode()
+        end_line = lines[end_lineno - 1].encode()
+        merged = (start_line[:col] + text.encode() + end_line[end_col:]).decode()
+        lines[lineno - 1:end_lineno] = [merged]
+    return "".join(lines)
+
+def analyze_code(code: str, mode: str = CODE_GUARD, read_files: Optional[dict] = None,
+                 preloaded_files: Optional[set] = None) -> tuple:
+    """Find slow pandas patterns in a code cell
+    Returns: (code, hits) where code has the safe rewrites applied (mode "rewrite") and hits lists
+    {"rule", "action" ("rewritten" or "hinted"), "line", "detail"}.
+    read_files ({path: times read}) carries file reads over from earlier cells and is updated.
+    """
+    if mode == "off":
+        return code, []
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code, []
+    read_files = read_files if read_files is not None else {}
+    preloaded_files = preloaded_files or set()
+    hits = []
+    edits = []
+
+    def hit(rule, node, action, detail=""):
+        hits.append({"rule": rule, "action": action, "line": node.lineno, "detail": detail})
+
+    def visit(node, in_loop):
+        # iterrows loops are only hinted: no faster iteration yields the same row Series (numpy scalars, upcast dtypes)
+        if isinstance(node, ast.For) and isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Attribute) \
+                and node.iter.func.attr == "iterrows" and not node.iter.args and not node.iter.keywords:
+            hit("iterrows", node, "hinted")
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            # Row-wise apply of a simple arithmetic lambda becomes the same expression on whole columns.
+            # Frames where the results could differ (see _vector_guard) keep the apply at runtime
+            if node.func.attr == "apply" and _is_row_wise(node):
+                frame = node.func.value
+                function = node.args[0] if node.args else None
+                if (mode == "rewrite" and isinstance(function, ast.Lambda) and len(function.args.args) == 1
+                        and len(node.args) == 1 and all(k.arg == "axis" for k in node.keywords)
+                        and _is_simple_reference(frame) and _is_vectorizable(function.body, function.args.args[0].arg)
+                        and any(_is_row_column(child, function.args.args[0].arg) for child in ast.walk(function.body))):
+                    original = ast.unparse(node)
+                    frame_source = ast.unparse(frame)
+                    vectorized = ast.unparse(_RowToFrame(function.args.args[0].arg, frame).visit(function.body))
+                    # apply names its result None
+                    replacement = f"(({vectorized}).rename(None) if {_vector_guard(frame_source)} else {original})"
+                    edits.append((node.lineno, node.col_offset, node.end_lineno, node.end_col_offset, replacement))
+                    hit("row_apply", node, "rewritten", f"{original} -> ({vectorized})")
+                else:
+                    hit("row_apply", node, "hinted")
+
+            # Reading a file that is pre-loaded, or that was already read
+            if node.func.attr in _READ_FUNCTIONS and node.args and isinstance(node.args[0], ast.Constant) \
+                    and isinstance(node.args[0].value, str):
+                path = node.args[0].value
+                if path in preloaded_files or os.path.normpath(path) in preloaded_files:
+                    hit("preloaded_read", node, "hinted", path)
+                elif read_files.get(path, 0) > 0 or in_loop:
+                    hit("repeated_read", node, "hinted", path)
+                read_files[path] = read_files.get(path, 0) + 1
+
+        # x = pd.concat([x, ...]) or x = x.append(...) inside a loop
+        if in_loop and isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) \
+                and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute):
+            name = node.targets[0].id
+            call = node.value
+            grows = False
+            if call.func.attr == "concat" and call.args and isinstance(call.args[0], (ast.List, ast.Tuple)):
+                grows = any(isinstance(elt, ast.Name) and elt.id == name for elt in call.args[0].elts)
+            elif call.func.attr == "append" and isinstance(call.func.value, ast.Name) and call.func.value.id == name:
+                grows = True
+            if grows:
+                hit("concat_in_loop", node, "hinted", name)
+
+        loop_body = isinstance(node, (ast.For, ast.While, ast.AsyncFor))
+        for child in ast.iter_child_nodes(node):
+            # The loop's iterable is evaluated once; only its body repeats
+            child_in_loop = in_loop or (loop_body and child is not getattr(node, "iter", None) and child is not getattr(node, "test", None))
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+                child_in_loop = False
+            visit(child, child_in_loop)
+
+    visit(tree, False)
+    if edits:
+        code = _replace_segments(code, edits)
+    for item in hits:
+        CODE_GUARD_HITS.labels(rule=item["rule"], action=item["action"]).inc()
+    return code, hits
+
+def format_guard_message(hits: list) -> str:
+    """Console note shown before the cell's output, so the model sees it in the conversation"""
+    lines = []
+    for item in hits:
+        if item["action"] == "rewritten":
+            lines.append(f"[code guard] line {item['line']}: rewritten for speed ({item['detail']}).")
+        else:
+            detail = f" ({item['detail']})" if item["detail"] else ""
+            lines.append(f"[code guard] line {item['line']}{detail}: {RULE_HINTS[item['rule']]}")
+    return "\n".join(lines) + "\n"
+
+class CodeGuard:
+    """Checks each Python cell the interpreter runs before it is executed
+    Safe rewrites are applied to the executed code; hints are added to the cell's output, where the model
+    reads them before writing its next cell.
+    """
+
+    def __init__(self, interpreter, preloaded_files: Optional[List[str]] = None, mode: str = CODE_GUARD):
+        self.interpreter = interpreter
+        self.mode = mode
+        self.preloaded_files = {os.path.normpath(path) for path in preloaded_files or []} | set(preloaded_files or [])
+        self.read_files = {}
+        self.hits = []
+        self._cells = 0
+        self._lock = threading.Lock()
+
+    def _guarded_stream(self, message: str, chunks):
+        yield {"type": "console", "format": "output", "content": message}
+        yield from chunks
+
+    @contextmanager
+    def attach(self):
+        """Guard cells run during the block by wrapping interpreter.computer.run"""
+        computer = self.interpreter.computer
+        previous = computer.__dict__.get("run")
+        original_run = computer.run
+
+        def guarded_run(language, code, *args, **kwargs):
+            if self.mode == "off" or language != "python" or not kwargs.get("stream"):
+                return original_run(language, code, *args, **kwargs)
+            with self._lock:
+                self._cells += 1
+                cell = self._cells
+                code, hits = analyze_code(code, self.mode, self.read_files, self.preloaded_files)
+                self.hits.extend(dict(item, cell=cell) for item in hits)
+            chunks = original_run(language, code, *args, **kwargs)
+            if not hits:
+                return chunks
+            return self._guarded_stream(format_guard_message(hits), chunks)
+
+        computer.run = guarded_run
+        try:
+            yield self
+        finally:
+            if computer.__dict__.get("run") is guarded_run:
+                if previous is None:
+                    del computer.run
+                else:
+                    computer.run = previous
@@ -0,0 +1,198 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from api.data_cache import load_sheets, file_version, CSV_SHEET_NAME
+
+# Maximum number of prompt tokens spent on describing the files
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+# Rows of sample data shown per sheet
+SAMPLE_ROWS = 2
+# Sample values are cut to this many characters
+SAMPLE_VALUE_CHARS = 20
+
+# Rendered file blocks per file version: {file_version: [sheet blocks]}
+_block_cache = OrderedDict()
+# Final contexts: {(file versions, prompt terms, budget): context}
+_context_cache = OrderedDict()
+_cache_lock = threading.Lock()
+MAX_CACHE_ENTRIES = 64
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate (4 chars per token) if the encoding can't be loaded"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def _cache_put(cache: OrderedDict, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MAX_CACHE_ENTRIES:
+            cache.popitem(last=False)
+
+def _cache_get(cache: OrderedDict, key):
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    return None
+
+def _words(text: str) -> List[str]:
+    """Lower-case words of a prompt or name; underscores separate words too (order_date -> order, date)"""
+    return re.findall(r"[^\W_]+", str(text).lower())
+
+def _prompt_terms(prompt: Optional[str]) -> frozenset:
+    """Lower-case words of the prompt used to rank sheets and columns"""
+    if not prompt:
+        return frozenset()
+    return frozenset(word for word in _words(prompt) if len(word) > 2)
+
+def _relevance(name: str, terms: frozenset) -> int:
+    """Number of prompt terms that are whole words of a sheet or column name
+    Names shorter than 3 characters ("id", "a") never count as relevant.
+    """
+    if not terms or len(str(name).strip()) < 3:
+        return 0
+    return len(terms.intersection(_words(name)))
+
+def _render_sample_value(value) -> str:
+    text = str(value)
+    if len(text) > SAMPLE_VALUE_CHARS:
+        text = text[:SAMPLE_VALUE_CHARS] + "…"
+    return text
+
+def _build_sheet_blocks(file_path: str) -> list:
+    """Render schema pieces (header, columns with dtypes, sample rows) for every sheet of a file"""
+    blocks = []
+    for sheet_name, df in load_sheets(file_path).items():
+        if df.empty:
+            continue
+        if sheet_name == CSV_SHEET_NAME and file_path.endswith('.csv'):
+            header = f"  {len(df)} rows, {len(df.columns)} columns\n"
+        else:
+            header = f"  Sheet '{sheet_name}': {len(df)} rows, {len(df.columns)} columns\n"
+        columns = []
+        for column, dtype in df.dtypes.items():
+            text = f"{column} ({dtype})"
+            columns.append((str(column), text, count_tokens(text + ", ")))
+        sample_lines = []
+        for row in df.head(SAMPLE_ROWS).itertuples(index=False):
+            sample_lines.append("      " + " | ".join(_render_sample_value(v) for v in row))
+        sample = "    Sample:\n" + "\n".join(sample_lines) + "\n" if sample_lines else ""
+        blocks.append({
+            "sheet_name": sheet_name,
+            "header": header,
+            "header_tokens": count_tokens(header),
+            "columns": columns,
+            "sample": sample,
+            "sample_tokens": count_tokens(sample)
+        })
+    return blocks
+
+def get_sheet_blocks(file_path: str) -> list:
+    """Get rendered sheet blocks for the current version of a file (cached per version)"""
+    version = file_version(file_path)
+    blocks = _cache_get(_block_cache, version)
+    if blocks is None:
+        blocks = _build_sheet_blocks(file_path)
+        _cache_put(_block_cache, version, blocks)
+    return blocks
+
+def build_file_context(file_paths: List[str], prompt: Optional[str] = None, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Create a context string describing the files that fits into token_budget
+    File and sheet headers are always included; columns (with dtypes) and sample rows are added
+    in order of relevance to the prompt until the budget is used up.
+    """
+    terms = _prompt_terms(prompt)
+    versions = []
+    for file_path in file_paths:
+        try:
+            versions.append(file_version(file_path))
+        except OSError:
+            versions.append(None)
+    cache_key = (tuple(file_paths), tuple(versions), terms, token_budget)
+    cached = _cache_get(_context_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    # First pass: headers for every file and sheet
+    files = []
+    used_tokens = count_tokens("Available files:\n")
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        if file_path.endswith('.txt'):
+            files.append({"line": f"\n- {name}: Text file\n", "sheets": []})
+            continue
+        try:
+            blocks = get_sheet_blocks(file_path)
+        except Exception as e:
+            files.append({"line": f"\n- {name}: Error reading file - {str(e)}\n", "sheets": []})
+            continue
+        if not blocks:
+            line = f"\n- {name}: Empty or unsupported file\n"
+        elif file_path.endswith('.csv'):
+            line = f"\n- {name}: CSV file\n"
+        else:
+            line = f"\n- {name}: Excel file with {len(blocks)} sheet(s)\n"
+        sheets = []
+        for block in blocks:
+            sheets.append({
+                "block": block,
+                "relevance": _relevance(block["sheet_name"], terms) +
+                             sum(_relevance(column, terms) for column, _, _ in block["columns"]),
+                "columns": [],
+                "omitted_columns": len(block["columns"]),
+                "sample": ""
+            })
+            used_tokens += block["header_tokens"]
+        files.append({"line": line, "sheets": sheets})
+        used_tokens += count_tokens(line)
+
+    # Second pass: columns, most relevant sheets and columns first
+    ranked_sheets = sorted(
+        [sheet for file_info in files for sheet in file_info["sheets"]],
+        key=lambda sheet: -sheet["relevance"]
+    )
+    for sheet in ranked_sheets:
+        columns = sorted(sheet["block"]["columns"], key=lambda column: -_relevance(column[0], terms))
+        for column_name, text, tokens in columns:
+            if used_tokens + tokens > token_budget:
+                break
+            sheet["columns"].append(text)
+            used_tokens += tokens
+        sheet["omitted_columns"] = len(columns) - len(sheet["columns"])
+
+    # Third pass: tiny samples while budget remains
+    for sheet in ranked_sheets:
+        sample_tokens = sheet["block"]["sample_tokens"]
+        if sheet["block"]["sample"] and used_tokens + sample_tokens <= token_budget:
+            sheet["sample"] = sheet["block"]["sample"]
+            used_tokens += sample_tokens
+
+    context = "Available files:\n"
+    for file_info in files:
+        context += file_info["line"]
+        for sheet in file_info["sheets"]:
+            context += sheet["block"]["header"]
+            if sheet["columns"]:
+                context += f"    Columns: {', '.join(sheet['columns'])}"
+                if sheet["omitted_columns"]:
+                    context += f", ... and {sheet['omitted_columns']} more columns"
+                context += "\n"
+            elif sheet["omitted_columns"]:
+                context += f"    Columns: {sheet['omitted_columns']} columns (inspect with df.columns)\n"
+            context += sheet["sample"]
+
+    _cache_put(_context_cache, cache_key, context)
+    return context
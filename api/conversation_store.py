@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Optional
+from api.sqlite_store import SQLiteStore
+
+# SQLite database with the Streamlit conversation history
+CONVERSATION_STORE_PATH = os.getenv("CONVERSATION_STORE_PATH", os.path.join(".conversations", "history.db"))
+# Conversations are deleted this long after their last message (seconds, 0 = keep forever)
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", str(30 * 86400)))
+# Expired messages are swept at most this often (seconds)
+EVICTION_INTERVAL = 3600
+
+# Fields returned by list(); the answer, logs and run statistics are only loaded for a single message
+SUMMARY_FIELDS = ("message_id", "conversation_id", "prompt", "answer_file", "created_at")
+
+class ConversationStore(SQLiteStore):
+    """Prompts and answers per conversation in a SQLite database (WAL mode), newest first"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id TEXT PRIMARY KEY,
+            conversation_id TEXT NOT NULL,
+            prompt TEXT,
+            answer_file TEXT,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_created ON messages (created_at);
+    """
+
+    def __init__(self, path: str = CONVERSATION_STORE_PATH, ttl: int = CONVERSATION_TTL_SECONDS):
+        self.ttl = ttl
+        self._last_eviction = 0.0
+        super().__init__(path)
+
+    def add(self, conversation_id: str, message: dict) -> str:
+        """Store a message (prompt, answer, logs, files, run statistics) and return its id"""
+        message_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO messages (message_id, conversation_id, prompt, answer_file, content, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (message_id, conversation_id, message.get("prompt"), message.get("answer_file"),
+             json.dumps(message, default=str), time.time())
+        )
+        self._maybe_evict()
+        return message_id
+
+    def get(self, message_id: str) -> Optional[dict]:
+        """The full message, None if it doesn't exist"""
+        row = self._connect().execute(
+            "SELECT message_id, created_at, content FROM messages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        message = json.loads(row["content"])
+        message.update(message_id=row["message_id"], created_at=row["created_at"])
+        return message
+
+    def list(self, conversation_id: str, limit: int = 20, before: Optional[float] = None) -> list:
+        """Message summaries of a conversation, newest first; before pages back in time"""
+        conditions = ["conversation_id = ?"]
+        params = [conversation_id]
+        if before is not None:
+            conditions.append("created_at < ?")
+            params.append(before)
+        rows = self._connect().execute(
+            f"SELECT {', '.join(SUMMARY_FIELDS)} FROM messages WHERE {' AND '.join(conditions)} "
+            f"ORDER BY created_at DESC LIMIT ?", params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, conversation_id: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM messages WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()[0]
+
+    def clear(self, conversation_id: str) -> int:
+        """Delete every message of a conversation, returns how many were deleted"""
+        return self._connect().execute(
+            "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+        ).rowcount
+
+    def evict_expired(self) -> int:
+        """Delete conversations without a message in the last ttl seconds, returns how many messages were deleted"""
+        self._last_eviction = time.time()
+        if not self.ttl:
+            return 0
+        return self._connect().execute(
+            "DELETE FROM messages WHERE conversation_id IN "
+            "(SELECT conversation_id FROM messages GROUP BY conversation_id HAVING MAX(created_at) <= ?)",
+            (time.time() - self.ttl,)
+        ).rowcount
+
+    def _maybe_evict(self):
+        if time.time() - self._last_eviction > EVICTION_INTERVAL:
+            self.evict_expired()
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    """Process-wide conversation store"""
+    global _conversation_store
+    with _conversation_store_lock:
+        if _conversation_store is None:
+            _conversation_store = ConversationStore()
+        return _conversation_store
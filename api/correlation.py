@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Rows used for correlations; larger sheets are randomly sampled (0 = always use every row)
+CORRELATION_SAMPLE_ROWS = int(os.getenv("CORRELATION_SAMPLE_ROWS", "200000"))
+# Widest sheet (numeric columns) whose full correlation matrix is kept; wider sheets only get the top pairs
+MAX_MATRIX_COLUMNS = int(os.getenv("CORRELATION_MAX_MATRIX_COLUMNS", "100"))
+# Strongest pairs kept per sheet
+TOP_PAIRS = 100
+# Minimum overlapping non-null rows for a pair to get a coefficient
+MIN_PERIODS = 2
+
+def pairwise_correlation(values: np.ndarray, min_periods: int = MIN_PERIODS):
+    """Pearson correlations of all column pairs of a 2-D float array, ignoring NaN pairwise
+    Same result as DataFrame.corr(), but from a handful of matrix products over the data instead
+    of one pass per column pair. Returns (correlations, overlapping row counts).
+    """
+    mask = np.isfinite(values)
+    if mask.all():
+        # No missing values: one product of the standardized columns
+        centered = values - values.mean(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            standardized = centered / np.sqrt((centered * centered).sum(axis=0))
+        correlations = standardized.T @ standardized
+        correlations[~np.isfinite(correlations)] = np.nan
+        if len(values) < min_periods:
+            correlations[:] = np.nan
+        np.clip(correlations, -1.0, 1.0, out=correlations)
+        return correlations, np.full(correlations.shape, len(values), dtype=np.int64)
+    # Centering first keeps the sums small, which avoids cancellation in the variance terms
+    centered = values - np.nanmean(np.where(mask, values, np.nan), axis=0)
+    centered = np.where(mask, centered, 0.0)
+    weights = mask.astype(float)
+    counts = weights.T @ weights
+    sums = centered.T @ weights                    # sums[i, j]: column i over rows where j is set
+    squares = (centered * centered).T @ weights
+    products = centered.T @ centered
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = counts * products - sums * sums.T
+        variance = (counts * squares - sums * sums) * (counts * squares.T - sums.T * sums.T)
+        correlations = covariance / np.sqrt(variance)
+    correlations[(counts < min_periods) | ~np.isfinite(correlations)] = np.nan
+    np.clip(correlations, -1.0, 1.0, out=correlations)
+    return correlations, counts.astype(np.int64)
+
+def top_pairs(correlations: np.ndarray, columns: list, k: int = TOP_PAIRS) -> list:
+    """The k column pairs with the largest absolute correlation, strongest first"""
+    upper_i, upper_j = np.triu_indices(len(columns), k=1)
+    strengths = np.abs(correlations[upper_i, upper_j])
+    valid = np.flatnonzero(np.isfinite(strengths))
+    if len(valid) > k:
+        valid = valid[np.argpartition(-strengths[valid], k - 1)[:k]]
+    valid = valid[np.argsort(-strengths[valid], kind="stable")]
+    return [
+        {"a": columns[upper_i[p]], "b": columns[upper_j[p]], "r": float(correlations[upper_i[p], upper_j[p]])}
+        for p in valid
+    ]
+
+def correlation_summary(numeric: pd.DataFrame, sample_rows: int = CORRELATION_SAMPLE_ROWS,
+                        max_matrix_columns: int = MAX_MATRIX_COLUMNS) -> dict:
+    """Correlations of the numeric columns of a sheet for storing in its profile
+    {"columns", "matrix" (None for sheets wider than max_matrix_columns), "top_pairs", "rows", "sampled_rows"}
+    """
+    columns = [str(column) for column in numeric.columns]
+    values = numeric.to_numpy(dtype=float, na_value=np.nan)
+    sampled_rows = None
+    if sample_rows and len(values) > sample_rows:
+        # Fixed seed so the same file version always gives the same coefficients
+        rows = np.sort(np.random.default_rng(0).choice(len(values), sample_rows, replace=False))
+        values = values[rows]
+        sampled_rows = sample_rows
+    correlations, _ = pairwise_correlation(values)
+    matrix = None
+    if len(columns) <= max_matrix_columns:
+        matrix = [[None if np.isnan(value) else float(value) for value in row] for row in correlations]
+    return {
+        "columns": columns,
+        "matrix": matrix,
+        "top_pairs": top_pairs(correlations, columns),
+        "rows": len(numeric),
+        "sampled_rows": sampled_rows
+    }
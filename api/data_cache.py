@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import pandas as pd
+
+# Folder where parsed files are stored as columnar sidecars
+CACHE_FOLDER = os.getenv("DATA_CACHE_FOLDER", ".data_cache")
+
+# Sheet key used for CSV files, which have no sheet names
+CSV_SHEET_NAME = "csv"
+
+# Number of parsed files kept in memory
+MAX_CACHED_FILES = int(os.getenv("DATA_CACHE_MAX_FILES", "16"))
+
+# Threads parsing files ahead of their first use (e.g. files generated by an analysis)
+PREFETCH_WORKERS = int(os.getenv("DATA_PREFETCH_WORKERS", "2"))
+
+# In-memory LRU cache of parsed files: {cache_key: {sheet_name: DataFrame}}
+_parsed_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Files being parsed in the background: {cache_key: Future}
+_prefetching = {}
+_prefetch_executor = None
+
+def file_version(file_path: str) -> str:
+    """Return a key identifying the current version of a file (path, size and mtime)"""
+    stat = os.stat(file_path)
+    raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.md5(raw.encode()).hexdigest()[:16]
+
+def get_sidecar_folder(file_path: str) -> str:
+    """Get the sidecar folder for the current version of a file"""
+    return os.path.join(CACHE_FOLDER, file_version(file_path))
+
+def _parse_file(file_path: str) -> dict:
+    """Parse Excel or CSV file into a dict of DataFrames keyed by sheet name"""
+    if file_path.endswith('.csv'):
+        return {CSV_SHEET_NAME: pd.read_csv(file_path)}
+    excel_file = pd.ExcelFile(file_path)
+    sheets_dict = {}
+    for sheet_name in excel_file.sheet_names:
+        sheets_dict[sheet_name] = pd.read_excel(excel_file, sheet_name=sheet_name)
+    return sheets_dict
+
+def _write_sidecars(sidecar_folder: str, sheets: dict) -> dict:
+    """Write each sheet as a parquet file (pickle if parquet is unavailable) and return the manifest"""
+    os.makedirs(sidecar_folder, exist_ok=True)
+    manifest = {"sheets": []}
+    for index, (sheet_name, df) in enumerate(sheets.items()):
+        base_path = os.path.join(sidecar_folder, f"sheet_{index}")
+        try:
+            # Parquet needs string column names and uniform column types
+            df.to_parquet(base_path + ".parquet", index=False)
+            sheet_path = base_path + ".parquet"
+        except Exception:
+            df.to_pickle(base_path + ".pkl")
+            sheet_path = base_path + ".pkl"
+        manifest["sheets"].append({
+            "name": sheet_name,
+            "path": sheet_path,
+            "rows": len(df),
+            "columns": len(df.columns)
+        })
+    # Write manifest last so a half-written folder is never treated as complete
+    with open(os.path.join(sidecar_folder, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+def read_sidecar(sheet_path: str) -> pd.DataFrame:
+    """Read a single sidecar file"""
+    if sheet_path.endswith('.parquet'):
+        return pd.read_parquet(sheet_path)
+    return pd.read_pickle(sheet_path)
+
+def ensure_sidecars(file_path: str) -> dict:
+    """Make sure columnar sidecars exist for the current version of a file and return the manifest"""
+    sidecar_folder = get_sidecar_folder(file_path)
+    manifest_path = os.path.join(sidecar_folder, "manifest.json")
+    sheets = None
+    if not os.path.exists(manifest_path):
+        # Parsing writes the sidecars as a side effect
+        sheets = load_sheets(file_path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return _write_sidecars(sidecar_folder, sheets)
+
+def load_sheets(file_path: str) -> dict:
+    """Load a file as {sheet_name: DataFrame}, using the memory cache and sidecars before parsing
+    CSV files are returned as a single sheet named CSV_SHEET_NAME. Waits for a background parse
+    of the same file version started by prefetch_sheets().
+    """
+    cache_key = file_version(file_path)
+    with _cache_lock:
+        if cache_key in _parsed_cache:
+            _parsed_cache.move_to_end(cache_key)
+            return _parsed_cache[cache_key]
+        future = _prefetching.get(cache_key)
+    if future is not None:
+        return future.result()
+    return _load_sheets(file_path, cache_key)
+
+def _load_sheets(file_path: str, cache_key: str) -> dict:
+    sidecar_folder = os.path.join(CACHE_FOLDER, cache_key)
+    manifest_path = os.path.join(sidecar_folder, "manifest.json")
+    sheets = None
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            sheets = {entry["name"]: read_sidecar(entry["path"]) for entry in manifest["sheets"]}
+        except Exception:
+            sheets = None
+
+    if sheets is None:
+        sheets = _parse_file(file_path)
+        try:
+            _write_sidecars(sidecar_folder, sheets)
+        except Exception:
+            # Sidecars are an optimization only
+            pass
+
+    with _cache_lock:
+        _parsed_cache[cache_key] = sheets
+        while len(_parsed_cache) > MAX_CACHED_FILES:
+            _parsed_cache.popitem(last=False)
+    return sheets
+
+def prefetch_sheets(file_path: str) -> Optional[Future]:
+    """Parse a file in the background, so a later load_sheets() is served from memory
+    Returns the running parse (None if the file is already cached or missing).
+    """
+    global _prefetch_executor
+    try:
+        cache_key = file_version(file_path)
+    except OSError:
+        return None
+    with _cache_lock:
+        if cache_key in _parsed_cache:
+            return None
+        if cache_key in _prefetching:
+            return _prefetching[cache_key]
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        future = _prefetch_executor.submit(_load_sheets, file_path, cache_key)
+        _prefetching[cache_key] = future
+    future.add_done_callback(lambda _: _forget_prefetch(cache_key))
+    return future
+
+def _forget_prefetch(cache_key: str):
+    with _cache_lock:
+        _prefetching.pop(cache_key, None)
@@ -0,0 +1,171 @@
+import os
+import json
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from api.data_cache import load_sheets, file_version, CACHE_FOLDER
+from api.chart_data import finite_values, histogram_bins, box_summary, row_series
+from api.correlation import correlation_summary
+
+# Profiles are stored in the file's sidecar folder under this name
+PROFILE_FILE = "profile.json"
+# Bumped when the profile contents change, so stored profiles of an older format are recomputed
+PROFILE_FORMAT = 4
+# Threads computing profiles in the background (uploads, preloads)
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", "2"))
+# Number of file profiles kept in memory
+MAX_CACHED_PROFILES = 64
+
+# {file_version: profile}
+_profiles = OrderedDict()
+# Profiles being computed: {file_version: Future}
+_pending = {}
+_profile_lock = threading.Lock()
+_executor = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _profile_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix="profile")
+        return _executor
+
+def _json_value(value):
+    """Native Python value for JSON, with NaN/Inf as None"""
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    if value is None or isinstance(value, (int, bool, str)):
+        return value
+    return str(value)
+
+def _table(df: pd.DataFrame) -> dict:
+    """DataFrame as {"index", "columns", "data"} with JSON-safe values"""
+    return {
+        "index": [str(label) for label in df.index],
+        "columns": [str(column) for column in df.columns],
+        "data": [[_json_value(value) for value in row] for row in df.itertuples(index=False, name=None)]
+    }
+
+def compute_sheet_profile(df: pd.DataFrame) -> dict:
+    """Summary statistics, missing values, dtypes, memory usage, correlations and chart data of one sheet
+    Histograms, box plots and the values-by-row series (downsampled) are stored precomputed,
+    so chart size doesn't depend on the row count.
+    """
+    numeric = df.select_dtypes(include=['number'])
+    null_counts = df.isnull().sum()
+    distributions = {}
+    for column in numeric.columns:
+        values = finite_values(numeric[column])
+        distributions[str(column)] = {
+            "histogram": histogram_bins(values),
+            "box": box_summary(values),
+            "rows": row_series(numeric[column])
+        }
+    profile = {
+        "rows": len(df),
+        "columns": len(df.columns),
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "column_info": [
+            {
+                "column": str(column),
+                "dtype": str(dtype),
+                "non_null": int(len(df) - nulls),
+                "null": int(nulls)
+            }
+            for column, dtype, nulls in zip(df.columns, df.dtypes, null_counts.values)
+        ],
+        "numeric_columns": [str(column) for column in numeric.columns],
+        "describe": _table(numeric.describe()) if len(numeric.columns) > 0 else None,
+        "correlation": correlation_summary(numeric) if len(numeric.columns) > 1 else None,
+        "distributions": distributions
+    }
+    return profile
+
+def _profile_path(version: str) -> str:
+    return os.path.join(CACHE_FOLDER, version, PROFILE_FILE)
+
+def _remember(version: str, profile: dict):
+    with _profile_lock:
+        _profiles[version] = profile
+        _profiles.move_to_end(version)
+        while len(_profiles) > MAX_CACHED_PROFILES:
+            _profiles.popitem(last=False)
+
+def _stored_profile(version: str):
+    """Profile from memory or the sidecar folder, None if it hasn't been computed"""
+    with _profile_lock:
+        if version in _profiles:
+            _profiles.move_to_end(version)
+            return _profiles[version]
+    try:
+        with open(_profile_path(version), "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get("format") != PROFILE_FORMAT:
+        return None
+    _remember(version, profile)
+    return profile
+
+def _build_profile(file_path: str, version: str) -> dict:
+    profile = {
+        "format": PROFILE_FORMAT,
+        "file_version": version,
+        "sheets": {str(name): compute_sheet_profile(df) for name, df in load_sheets(file_path).items()}
+    }
+    path = _profile_path(version)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so readers never see a partial profile
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError:
+        # The stored copy is an optimization only
+        pass
+    _remember(version, profile)
+    return profile
+
+def _profile_future(file_path: str, version: str) -> Future:
+    """The running computation for a file version, started if there is none"""
+    executor = _get_executor()
+    with _profile_lock:
+        future = _pending.get(version)
+        if future is not None:
+            return future
+        future = executor.submit(_build_profile, file_path, version)
+        _pending[version] = future
+    # Outside the lock: a build that already finished runs the callback right here
+    future.add_done_callback(lambda _: _forget_pending(version))
+    return future
+
+def _forget_pending(version: str):
+    with _profile_lock:
+        _pending.pop(version, None)
+
+def schedule_profile(file_path: str):
+    """Compute the profile of a file in the background unless it is already stored"""
+    try:
+        version = file_version(file_path)
+    except OSError:
+        return
+    if _stored_profile(version) is None:
+        _profile_future(file_path, version)
+
+def get_file_profile(file_path: str) -> dict:
+    """Profile of the current version of a file: {"file_version", "sheets": {sheet_name: profile}}
+    Computed once per file version (waiting for a background computation that is already running)
+    and stored next to the file's columnar sidecars. CSV files have a single sheet named CSV_SHEET_NAME.
+    """
+    version = file_version(file_path)
+    profile = _stored_profile(version)
+    if profile is not None:
+        return profile
+    return _profile_future(file_path, version).result()
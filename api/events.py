@@ -0,0 +1,220 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+# Marks the end of a channel's events
+_CLOSED = object()
+
+# Output is coalesced into one frame per window or per this many characters, whichever comes first
+OUTPUT_WINDOW_SECONDS = 0.05
+OUTPUT_FRAME_CHARS = 4096
+# Output frames allowed to wait for a slow client before new output is held back
+MAX_QUEUED_FRAMES = 64
+# Output held back for a slow client beyond this is skipped in the stream (it stays in the full log)
+MAX_BACKLOG_CHARS = 1_000_000
+# Events kept per task for clients that reconnect with Last-Event-ID
+EVENT_LOG_SIZE = int(os.getenv("EVENT_LOG_SIZE", "2000"))
+# Finished tasks keep their event log this long (seconds)
+EVENT_LOG_TTL = int(os.getenv("EVENT_LOG_TTL", "600"))
+
+class EventChannel:
+    """Pushes events from worker threads to an asyncio consumer without polling
+    publish() and close() may be called from any thread; subscribe() runs on the event loop
+    and waits on the queue, so an idle stream holds no thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def call_soon(self, callback, *args):
+        """Run callback on the event loop thread"""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            pass
+
+    def publish(self, event: dict):
+        self.call_soon(self._queue.put_nowait, event)
+
+    def close(self):
+        self.call_soon(self._queue.put_nowait, _CLOSED)
+
+    def publish_on_loop(self, event: dict):
+        """Publish from the event loop thread itself, keeping order with already scheduled events"""
+        self._queue.put_nowait(event)
+
+    def backlog(self) -> int:
+        """Number of events waiting for the consumer (call on the event loop thread)"""
+        return self._queue.qsize()
+
+    async def subscribe(self, heartbeat_interval: float = 5.0):
+        """Yield events as they are published, with a heartbeat event after heartbeat_interval of silence
+        (no heartbeats if heartbeat_interval is None)
+        """
+        while True:
+            try:
+                if heartbeat_interval is None:
+                    event = await self._queue.get()
+                else:
+                    event = await asyncio.wait_for(self._queue.get(), timeout=heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield {"type": "heartbeat"}
+                continue
+            if event is _CLOSED:
+                return
+            yield event
+
+class CoalescingOutput:
+    """Output buffer that publishes coalesced 'output' events to a channel
+    write() may be called from any thread; it passes the text on to `log` (which keeps the full
+    output) and buffers it until the next frame. Frames are sent at most once per window (or as soon
+    as OUTPUT_FRAME_CHARS are pending). While the client is behind (backlog() returns MAX_QUEUED_FRAMES
+    or more unsent events), output is held back and sent later as a larger frame. backlog defaults to the
+    channel's queue; pass the slowest follower's lag when the channel feeds a TaskEventLog.
+    """
+
+    def __init__(self, channel: EventChannel, log, window: float = OUTPUT_WINDOW_SECONDS,
+                 frame_chars: int = OUTPUT_FRAME_CHARS, max_queued_frames: int = MAX_QUEUED_FRAMES,
+                 max_backlog_chars: int = MAX_BACKLOG_CHARS, backlog=None):
+        self.channel = channel
+        self.log = log
+        self.backlog = backlog or channel.backlog
+        self.window = window
+        self.frame_chars = frame_chars
+        self.max_queued_frames = max_queued_frames
+        self.max_backlog_chars = max_backlog_chars
+        self.frames_sent = 0
+        self._chunks = []
+        self._pending_chars = 0
+        self._flush_scheduled = False
+        self._immediate_scheduled = False
+        self._lock = threading.Lock()
+
+    def write(self, text: str):
+        if not text:
+            return
+        self.log.write(text)
+        with self._lock:
+            self._chunks.append(text)
+            self._pending_chars += len(text)
+            schedule_immediate = self._pending_chars >= self.frame_chars and not self._immediate_scheduled
+            schedule_timer = not self._flush_scheduled and not schedule_immediate
+            self._immediate_scheduled = self._immediate_scheduled or schedule_immediate
+            self._flush_scheduled = self._flush_scheduled or schedule_timer
+        if schedule_immediate:
+            self.channel.call_soon(self._flush)
+        elif schedule_timer:
+            self.channel.call_soon(self.channel.loop.call_later, self.window, self._flush)
+
+    def flush(self):
+        # Pending output is published on the event loop's schedule (print(flush=True) calls this)
+        pass
+
+    def _take_pending(self) -> str:
+        """Remove and return the unsent text (caller holds the lock)"""
+        pending = self._chunks
+        self._chunks = []
+        skipped = self._pending_chars - self.max_backlog_chars
+        self._pending_chars = 0
+        text = "".join(pending)
+        if skipped > 0:
+            text = f"\n[... {skipped} characters skipped in the stream, see the full log ...]\n" + text[skipped:]
+        return text
+
+    def _flush(self, force: bool = False):
+        """Publish pending output as one frame (runs on the event loop thread)"""
+        if not force and self.backlog() >= self.max_queued_frames:
+            # Client is behind; retry later and let output accumulate into a larger frame
+            self.channel.loop.call_later(self.window, self._flush)
+            return
+        with self._lock:
+            self._flush_scheduled = False
+            self._immediate_scheduled = False
+            if not self._pending_chars:
+                return
+            text = self._take_pending()
+        self.frames_sent += 1
+        self.channel.publish_on_loop({"type": "output", "content": text})
+
+    def close(self):
+        """Flush remaining output and close the channel (may be called from any thread)"""
+        self.channel.call_soon(self._flush, True)
+        self.channel.close()
+
+class TaskEventLog:
+    """Bounded log of a task's events, numbered from 1, that any number of clients can follow
+    The producer appends events on the event loop thread; clients replay everything after the
+    last event they saw and then wait for new ones. Events older than the last `maxlen` are dropped,
+    and a client that asks for them gets a 'gap' event instead. lag() tells the producer how far the
+    slowest connected client is behind, so it can hold output back before that client loses events.
+    """
+
+    def __init__(self, maxlen: int = EVENT_LOG_SIZE):
+        self._events = deque(maxlen=maxlen)
+        self.last_id = 0
+        # Last event id taken by each connected follower
+        self._followers = {}
+        self.closed = False
+        self.closed_at = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake current followers; later waits use a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, event: dict) -> int:
+        """Add an event and return its id (call on the event loop thread)"""
+        self.last_id += 1
+        self._events.append((self.last_id, event))
+        self._notify()
+        return self.last_id
+
+    def close(self):
+        """Mark the task finished; followers return after the last event"""
+        self.closed = True
+        self.closed_at = time.time()
+        self._notify()
+
+    def lag(self) -> int:
+        """Events the slowest connected follower hasn't taken yet (0 without followers)"""
+        if not self._followers:
+            return 0
+        return self.last_id - min(self._followers.values())
+
+    def is_expired(self, ttl: float = EVENT_LOG_TTL) -> bool:
+        return self.closed and time.time() - self.closed_at > ttl
+
+    async def follow(self, last_event_id: int = 0, heartbeat_interval: float = 5.0):
+        """Yield (id, event) for every event after last_event_id, then live events until the log is closed
+        Heartbeat and gap events are yielded with id None.
+        """
+        follower = object()
+        self._followers[follower] = last_event_id
+        try:
+            while True:
+                changed = self._changed
+                if self._events and self._events[0][0] > last_event_id + 1:
+                    first_id = self._events[0][0]
+                    yield None, {"type": "gap", "from_id": last_event_id + 1, "to_id": first_id - 1}
+                    last_event_id = first_id - 1
+                for event_id, event in list(self._events):
+                    if event_id > last_event_id:
+                        yield event_id, event
+                        # Resumed only once the client took the event (the response waits on its socket)
+                        last_event_id = event_id
+                        self._followers[follower] = last_event_id
+                if self.closed and last_event_id >= self.last_id:
+                    return
+                if changed.is_set():
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield None, {"type": "heartbeat"}
+        finally:
+            self._followers.pop(follower, None)
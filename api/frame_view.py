@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+import numpy as np
+import pandas as pd
+
+# Sorted/filtered row orders kept for paging (one per frame version and view)
+VIEW_CACHE_SIZE = 32
+
+_views = OrderedDict()
+_views_lock = threading.Lock()
+
+def _filter_mask(df: pd.DataFrame, query: str, column: Optional[str] = None) -> np.ndarray:
+    """Rows containing query (case-insensitive) in the given column, or in any column"""
+    mask = np.zeros(len(df), dtype=bool)
+    for name in ([column] if column is not None else df.columns):
+        mask |= df[name].astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+    return mask
+
+def _sort_positions(df: pd.DataFrame, positions: np.ndarray, sort_by: str, ascending: bool) -> np.ndarray:
+    values = pd.Series(df[sort_by].to_numpy()[positions])
+    try:
+        order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+    except TypeError:
+        # Mixed types in an object column: sort by the text instead
+        order = values.astype(str).sort_values(ascending=ascending, kind="stable").index.to_numpy()
+    return positions[order]
+
+def get_row_order(df: pd.DataFrame, key: Hashable, sort_by: Optional[str] = None, ascending: bool = True,
+                  query: str = "", column: Optional[str] = None) -> np.ndarray:
+    """Row positions of df after filtering and sorting, cached per (key, view)
+    key identifies the frame version (e.g. file path, sheet and modification time).
+    """
+    cache_key = (key, sort_by, ascending, query, column)
+    with _views_lock:
+        if cache_key in _views:
+            _views.move_to_end(cache_key)
+            return _views[cache_key]
+    positions = np.arange(len(df))
+    if query:
+        positions = np.flatnonzero(_filter_mask(df, query, column))
+    if sort_by is not None and sort_by in df.columns:
+        positions = _sort_positions(df, positions, sort_by, ascending)
+    with _views_lock:
+        _views[cache_key] = positions
+        while len(_views) > VIEW_CACHE_SIZE:
+            _views.popitem(last=False)
+    return positions
@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+from interpreter import OpenInterpreter
+from api.stub_backend import install_backend
+
+# Number of warm interpreters kept ready
+POOL_SIZE = int(os.getenv("INTERPRETER_POOL_SIZE", "2"))
+# Number of tasks an interpreter serves before it is replaced with a fresh one
+MAX_USES = int(os.getenv("INTERPRETER_MAX_USES", "10"))
+
+# Code run in every new kernel so analyses don't pay for the imports
+WARMUP_CODE = "import pandas as pd\nimport numpy as np\nimport openpyxl"
+
+# Code run between tasks to clear the previous task's variables but keep the imports warm
+CLEANUP_CODE = "get_ipython().run_line_magic('reset', '-f')\n" + WARMUP_CODE
+
+class InterpreterPool:
+    """Pool of pre-started Open Interpreter instances with warm Python kernels"""
+
+    def __init__(self, size: int = POOL_SIZE, max_uses: int = MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.Queue()
+        self._uses = {}  # {id(instance): number of completed tasks}
+        self._warming = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._fill()
+
+    def _create(self):
+        """Create an interpreter and start its Python kernel"""
+        instance = OpenInterpreter()
+        instance.auto_run = True
+        instance.verbose = False
+        # Offline stub replaces instance.chat when LLM_BACKEND=stub
+        install_backend(instance)
+        instance.computer.run("python", WARMUP_CODE)
+        return instance
+
+    def _warm_one(self):
+        """Background worker that adds one warm interpreter to the pool"""
+        try:
+            instance = self._create()
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._uses[id(instance)] = 0
+            if closed:
+                self._terminate(instance)
+            else:
+                self._idle.put(instance)
+        except Exception as e:
+            print(f"Warning: Could not start interpreter for pool: {str(e)}")
+        finally:
+            with self._lock:
+                self._warming -= 1
+
+    def _fill(self):
+        """Start background workers until the pool has `size` warm or warming interpreters"""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - self._idle.qsize() - self._warming
+            self._warming += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _terminate(self, instance):
+        """Shut down an interpreter's kernels"""
+        try:
+            instance.reset()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Get a warm interpreter, or start one immediately if none is ready"""
+        try:
+            instance = self._idle.get_nowait()
+        except queue.Empty:
+            instance = self._create()
+            with self._lock:
+                self._uses[id(instance)] = 0
+        self._fill()
+        return instance
+
+    def release(self, instance, healthy: bool = True):
+        """Return an interpreter after a task
+        Unhealthy interpreters (errors, timeouts) and interpreters that reached max_uses are replaced.
+        Cleanup runs in the background so the caller isn't delayed.
+        """
+        with self._lock:
+            uses = self._uses.pop(id(instance), 0) + 1
+        if not healthy or uses >= self.max_uses or self._closed or self._idle.qsize() >= self.size:
+            threading.Thread(target=self._terminate, args=(instance,), daemon=True).start()
+            self._fill()
+            return
+        threading.Thread(target=self._recycle, args=(instance, uses), daemon=True).start()
+
+    def _recycle(self, instance, uses: int):
+        """Clear conversation and kernel variables but keep the kernel and imports alive"""
+        try:
+            instance.messages = []
+            instance.last_messages_count = 0
+            instance.computer.run("python", CLEANUP_CODE)
+        except Exception:
+            self._terminate(instance)
+            self._fill()
+            return
+        with self._lock:
+            self._uses[id(instance)] = uses
+        self._idle.put(instance)
+
+    def shutdown(self):
+        """Terminate all idle interpreters"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._terminate(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_interpreter_pool() -> InterpreterPool:
+    """Get the process-wide interpreter pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InterpreterPool()
+        return _pool
@@ -0,0 +1,59 @@
+import os
+from typing import List
+from api.data_cache import ensure_sidecars
+
+def build_seed_code(file_paths: List[str]) -> tuple:
+    """Build Python code that loads the parsed sidecars into a `sheets[file][sheet]` dict
+    Returns: (seed_code, description) where description lists the pre-loaded DataFrames
+    """
+    code_lines = [
+        "import pandas as pd",
+        "import numpy as np",
+        "def _load_sidecar(path):",
+        "    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_pickle(path)",
+        "sheets = {}",
+    ]
+    description_lines = []
+    for file_path in file_paths:
+        if file_path.endswith('.txt'):
+            continue
+        manifest = ensure_sidecars(file_path)
+        code_lines.append(f"sheets[{file_path!r}] = {{}}")
+        for entry in manifest["sheets"]:
+            sidecar_path = os.path.abspath(entry["path"])
+            code_lines.append(f"sheets[{file_path!r}][{entry['name']!r}] = _load_sidecar({sidecar_path!r})")
+            description_lines.append(
+                f"  sheets[{file_path!r}][{entry['name']!r}]: {entry['rows']} rows, {entry['columns']} columns"
+            )
+    code_lines.append("del _load_sidecar")
+    return "\n".join(code_lines), "\n".join(description_lines)
+
+def seed_interpreter_kernel(interpreter, file_paths: List[str]) -> str:
+    """Pre-load the already parsed files into the interpreter's Python kernel
+    Returns the description of the pre-loaded DataFrames for the prompt, or "" if seeding failed
+    (the model then falls back to reading the files itself).
+    """
+    try:
+        seed_code, description = build_seed_code(file_paths)
+        if not description:
+            return ""
+        output = interpreter.computer.run("python", seed_code)
+        for message in output or []:
+            if "Traceback" in str(message.get("content", "")):
+                return ""
+        return description
+    except Exception:
+        return ""
+
+def get_preloaded_instructions(preloaded_description: str) -> str:
+    """Instructions telling the model to use the pre-loaded DataFrames instead of re-reading files"""
+    if not preloaded_description:
+        return ""
+    return f"""
+PRE-LOADED DATA (already in memory in your Python session):
+The files are ALREADY parsed into a dict named `sheets`, keyed by exact file path and then sheet name
+(CSV files use the sheet name 'csv'). pandas is imported as pd and numpy as np.
+{preloaded_description}
+Use these DataFrames directly, e.g. df = sheets[path][sheet_name].copy()
+DO NOT call pd.read_excel or pd.read_csv on these files - it wastes minutes on large workbooks.
+"""
@@ -1,25 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from pydantic import BaseModel
 from typing import List, Optional
 import pandas as pd
 import numpy as np
 import os
 import shutil
-import tempfile
-from pathlib import Path
 import json
 import time
 import hashlib
-from interpreter import interpreter
 from dotenv import load_dotenv
-import io
-import sys
+from api.data_cache import load_sheets, CSV_SHEET_NAME
+from api.data_profile import get_file_profile, schedule_profile
+from api.kernel import seed_interpreter_kernel, get_preloaded_instructions
+from api.interpreter_pool import get_interpreter_pool
+from api.sessions import get_session_manager, get_followup_context
+from api.context_builder import build_file_context
+from api.stub_backend import is_stub_backend_enabled
+from api.events import EventChannel, CoalescingOutput, TaskEventLog
+from api.task_store import get_task_store
+from api.task_log import TaskLog, read_task_log, capture_output, TASK_LOG_PAGE_BYTES
+from api.cell_profiler import CellProfiler
+from api.code_guard import CodeGuard
+from api.resource_limits import ResourceLimits, ResourceLimitExceeded, INTERRUPT_GRACE_SECONDS
+from api.analysis_executor import get_analysis_executor
+from api.output_catalog import get_output_catalog
+from api.metrics import StageTimer, timed_chat, render_metrics, RequestMetricsMiddleware, CONTENT_TYPE_LATEST
 import traceback
 from functools import wraps
 import threading
-import queue
+import asyncio
 
 # Load environment variables
 load_dotenv()
@@ -34,19 +45,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Task-Id"],
 )
 
+# Request latency per route, exported on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 # Constants
 INPUT_FOLDERS = ["input_folder_1", "input_folder_2", "input_folder_3"]
 OUTPUT_FOLDER = "output"
 UPLOAD_FOLDER = "uploads"
+# Task watchers re-read the store this often to pick up updates made by other workers (seconds)
+TASK_WATCH_INTERVAL = float(os.getenv("TASK_WATCH_INTERVAL", "2"))
+# Maximum number of tasks one watcher subscription can follow
+MAX_WATCHED_TASKS = 50
 
 # Create necessary directories
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# In-memory storage for analysis tasks
-analysis_tasks = {}
+# Analysis tasks are kept in a shared store (SQLite by default) so every worker process sees them
+task_store = get_task_store()
+# Event logs of streamed tasks, so clients can reconnect: {task_id: TaskEventLog}
+task_event_logs = {}
+# Running stream pipelines (kept referenced until they finish)
+stream_pipelines = set()
+
+@app.on_event("startup")
+def start_interpreter_pool():
+    """Start warming interpreters before the first analysis arrives"""
+    get_interpreter_pool()
+
+@app.on_event("shutdown")
+def stop_interpreter_pool():
+    """Terminate idle interpreter kernels"""
+    get_interpreter_pool().shutdown()
 
 # Pydantic models
 class AnalysisRequest(BaseModel):
@@ -69,10 +102,17 @@ class TaskStatus(BaseModel):
 class PreviewFilesRequest(BaseModel):
     file_paths: List[str]
 
+class SessionRequest(BaseModel):
+    file_paths: List[str]
+
+class SessionMessageRequest(BaseModel):
+    prompt: str
+    timeout_seconds: Optional[int] = 300
+
 # Helper functions
 def load_api_key():
-    """Load API key from environment"""
-    return os.getenv("OPENAI_API_KEY")
+    """Load API key from environment (the offline stub backend needs none)"""
+    return os.getenv("OPENAI_API_KEY") or ("stub" if is_stub_backend_enabled() else None)
 
 def read_excel_or_csv(file_path: str):
     """Read Excel or CSV file into DataFrame or dict of DataFrames"""
@@ -80,49 +120,45 @@ def read_excel_or_csv(file_path: str):
         return pd.DataFrame()
     
     try:
+        # Parsed files are cached in memory and as columnar sidecars
+        sheets = load_sheets(file_path)
         if file_path.endswith('.csv'):
-            return pd.read_csv(file_path)
-        else:
-            excel_file = pd.ExcelFile(file_path)
-            sheets_dict = {}
-            for sheet_name in excel_file.sheet_names:
-                sheets_dict[sheet_name] = pd.read_excel(excel_file, sheet_name=sheet_name)
-            return sheets_dict
+            return sheets[CSV_SHEET_NAME]
+        return dict(sheets)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading {file_path}: {str(e)}")
 
-def get_file_context(file_paths: List[str]) -> str:
-    """Create context string from file paths"""
-    context = "Available files:\n"
-    for file_path in file_paths:
-        try:
-            if file_path.endswith('.txt'):
-                context += f"\n- {os.path.basename(file_path)}: Text file\n"
-                continue
-            
-            data = read_excel_or_csv(file_path)
-            if isinstance(data, dict):
-                context += f"\n- {os.path.basename(file_path)}: Excel file with {len(data)} sheet(s)\n"
-                for sheet_name, df in data.items():
-                    if not df.empty:
-                        context += f"  Sheet '{sheet_name}': {len(df)} rows, {len(df.columns)} columns\n"
-                        context += f"    Columns: {', '.join(df.columns.tolist())}\n"
-            elif isinstance(data, pd.DataFrame):
-                if not data.empty:
-                    context += f"\n- {os.path.basename(file_path)}: {len(data)} rows, {len(data.columns)} columns\n"
-                    context += f"  Columns: {', '.join(data.columns.tolist())}\n"
-        except Exception as e:
-            context += f"\n- {os.path.basename(file_path)}: Error reading file - {str(e)}\n"
-    return context
-
-def get_existing_output_files(output_folder: str) -> set:
-    """Get set of existing output files before execution"""
-    existing_files = set()
-    if os.path.exists(output_folder):
-        for file in os.listdir(output_folder):
-            if file.endswith(('.xlsx', '.xls', '.csv', '.txt')):
-                existing_files.add(os.path.join(output_folder, file))
-    return existing_files
+def get_file_context(file_paths: List[str], prompt: Optional[str] = None) -> str:
+    """Create context string from file paths, fitted to the token budget and cached per file version"""
+    return build_file_context(file_paths, prompt)
+
+def create_task_event_log(task_id: str) -> TaskEventLog:
+    """Register an event log for a streamed task, dropping logs of tasks that finished long ago"""
+    for expired_id in [tid for tid, log in task_event_logs.items() if log.is_expired()]:
+        del task_event_logs[expired_id]
+    event_log = TaskEventLog()
+    task_event_logs[task_id] = event_log
+    return event_log
+
+def event_stream_response(event_log: TaskEventLog, task_id: str, last_event_id: int = 0) -> StreamingResponse:
+    """Server-Sent Events response following a task's event log from last_event_id"""
+    async def format_events():
+        async for event_id, event in event_log.follow(last_event_id, heartbeat_interval=5):
+            if event_id is None:
+                yield f"data: {json.dumps(event)}\n\n"
+            else:
+                yield f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(
+        format_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "X-Task-Id": task_id
+        }
+    )
 
 def timeout_handler(timeout_seconds: int):
     """Decorator to add timeout to a function call"""
@@ -153,28 +189,47 @@ def timeout_handler(timeout_seconds: int):
         return wrapper
     return decorator
 
-def run_analysis(prompt: str, file_paths: List[str], output_folder: str, timeout_seconds: int, task_id: str):
-    """Run analysis in background"""
+def run_analysis(prompt: str, file_paths: List[str], output_folder: str, timeout_seconds: int, task_id: str, session=None):
+    """Run analysis in background
+    With a session, the session's interpreter and kernel state are reused and kept alive afterwards.
+    """
+    interpreter = None
+    interpreter_healthy = False
+    output_log = None
+    timer = StageTimer("background")
     try:
-        analysis_tasks[task_id]["status"] = "running"
-        analysis_tasks[task_id]["progress"] = 0.1
+        task_store.update(task_id, status="running", progress=0.1)
         
         api_key = load_api_key()
         if not api_key:
             raise Exception("OpenAI API key not found")
         
-        existing_files = get_existing_output_files(output_folder)
+        # Files added to the output catalog after this point are the task's outputs
+        with timer.stage("output_scan"):
+            output_mark = get_output_catalog(output_folder).refresh()
         
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         prompt_hash = hashlib.md5(prompt.encode()).hexdigest()[:8]
         summary_filename = f"summary_{timestamp}_{prompt_hash}.txt"
         summary_filepath = os.path.join(output_folder, summary_filename)
         
+        # Take a warm interpreter (clean kernel with pandas/numpy imported) from the pool,
+        # or keep using the session's interpreter
+        is_followup = session is not None and session.turns > 0
+        with timer.stage("acquire_interpreter"):
+            interpreter = session.interpreter if session is not None else get_interpreter_pool().acquire()
         interpreter.api_key = api_key
         interpreter.auto_run = True
         interpreter.verbose = False
         
-        file_context = get_file_context(file_paths)
+        # Pre-load the parsed files into the interpreter's Python kernel (a session already has them)
+        preloaded_instructions = ""
+        if not is_followup:
+            with timer.stage("seed_kernel"):
+                preloaded_instructions = get_preloaded_instructions(seed_interpreter_kernel(interpreter, file_paths))
+        
+        with timer.stage("file_context"):
+            file_context = get_file_context(file_paths, prompt)
         file_paths_str = "\n".join([f"  - {fp}" for fp in file_paths])
         
         system_context = f"""You are an expert data analyst working with Excel and CSV files.
@@ -184,13 +239,14 @@ Available files:
 
 File paths (use these exact paths in your code):
 {file_paths_str}
+{preloaded_instructions}
 
 Output folder: {output_folder}
 
 IMPORTANT INSTRUCTIONS:
 1. When reading files, use the exact file paths provided above
 2. When saving results, save to: {output_folder}
-3. Use pandas (pd.read_excel, pd.read_csv) to read files
+3. Use the pre-loaded `sheets` DataFrames when available, otherwise use pandas (pd.read_excel, pd.read_csv) to read files
 4. Use df.to_excel() or df.to_csv() to save results
 5. Always use index=False when saving Excel files
 6. Provide clear explanations of what you're doing
@@ -214,70 +270,98 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
    - Important conclusions
    - Any significant trends or changes identified
 11. DO NOT skip creating this summary file - it is required!"""
+        if is_followup:
+            system_context = get_followup_context(output_folder, summary_filepath)
         
-        analysis_tasks[task_id]["progress"] = 0.3
+        task_store.update(task_id, progress=0.3)
         
-        output_buffer = io.StringIO()
-        old_stdout = sys.stdout
+        # Output is spooled to the task's log file; only the tail stays in memory
+        output_log = TaskLog(task_id)
+        profiler = CellProfiler(interpreter)
+        # Slow pandas patterns in generated cells are rewritten or answered with a hint
+        guard = CodeGuard(interpreter, file_paths if preloaded_instructions or is_followup else None)
+        # CPU time, memory and wall-clock limits for the generated code
+        limits = ResourceLimits(interpreter, wall_seconds=timeout_seconds)
         
-        @timeout_handler(timeout_seconds)
+        # Backstop only: the wall-clock limit above stops the chat first, including the time an
+        # interrupted kernel gets before it is killed
+        @timeout_handler(timeout_seconds + INTERRUPT_GRACE_SECONDS * 2)
         def run_interpreter():
-            sys.stdout = output_buffer
-            try:
-                if hasattr(interpreter, 'reset'):
-                    interpreter.reset()
-                result = interpreter.chat(f"{system_context}\n\nUser request: {prompt}")
-                return result
-            finally:
-                sys.stdout = old_stdout
+            # Only this thread's output goes to the task's log (other analyses may be running)
+            with capture_output(output_log):
+                with timed_chat(interpreter, timer), limits.attach(), profiler.attach(), guard.attach():
+                    result = interpreter.chat(f"{system_context}\n\nUser request: {prompt}")
+            return result
         
-        analysis_tasks[task_id]["progress"] = 0.5
+        task_store.update(task_id, progress=0.5)
         
         run_interpreter()
-        response_text = output_buffer.getvalue()
-        sys.stdout = old_stdout
+        interpreter_healthy = True
+        response_text = output_log.tail()
         
-        analysis_tasks[task_id]["progress"] = 0.8
+        task_store.update(task_id, progress=0.8)
         
         # Check for newly generated files
-        generated_files = []
-        current_files = get_existing_output_files(output_folder)
-        for file_path in current_files:
-            if file_path not in existing_files:
-                generated_files.append(file_path)
+        with timer.stage("output_scan"):
+            generated_files = get_output_catalog(output_folder).added_since(output_mark)
+            get_output_catalog(output_folder).assign(generated_files, task_id, prompt_hash)
         
         # Read summary file
         main_answer = ""
-        if os.path.exists(summary_filepath):
-            with open(summary_filepath, "r", encoding="utf-8") as f:
-                main_answer = f.read().strip()
+        with timer.stage("summary"):
+            if os.path.exists(summary_filepath):
+                with open(summary_filepath, "r", encoding="utf-8") as f:
+                    main_answer = f.read().strip()
         
         if not main_answer:
             main_answer = "Analysis completed. Please check the generated files for results."
             if generated_files:
                 main_answer += f"\n\nGenerated files: {', '.join([os.path.basename(f) for f in generated_files])}"
         
-        analysis_tasks[task_id]["status"] = "completed"
-        analysis_tasks[task_id]["progress"] = 1.0
-        analysis_tasks[task_id]["result"] = {
+        result = {
             "main_answer": main_answer,
             "intermediate_steps": response_text,
+            "log": output_log.reference(),
             "generated_files": generated_files,
-            "answer_file": summary_filepath if os.path.exists(summary_filepath) else None
+            "answer_file": summary_filepath if os.path.exists(summary_filepath) else None,
+            "timings": timer.finish(),
+            "cells": profiler.cells,
+            "guard": guard.hits,
+            "resources": limits.usage()
         }
+        with timer.stage("store_result"):
+            task_store.update(task_id, status="completed", progress=1.0, result=result)
         
     except TimeoutError as e:
-        analysis_tasks[task_id]["status"] = "error"
-        analysis_tasks[task_id]["error"] = str(e)
+        task_store.update(task_id, status="error", error=str(e))
+    except ResourceLimitExceeded as e:
+        task_store.update(task_id, status="error", error=str(e), result={"resources": limits.usage(), "cells": profiler.cells})
     except Exception as e:
-        analysis_tasks[task_id]["status"] = "error"
-        analysis_tasks[task_id]["error"] = f"Error during execution: {str(e)}\n{traceback.format_exc()}"
+        task_store.update(task_id, status="error", error=f"Error during execution: {str(e)}\n{traceback.format_exc()}")
+    finally:
+        if output_log is not None:
+            output_log.close()
+        # Timed out or failed interpreters are replaced instead of reused
+        if session is not None:
+            session.touch()
+            if interpreter_healthy:
+                session.turns += 1
+            else:
+                get_session_manager().close(session.session_id, healthy=False)
+            session.lock.release()
+        elif interpreter is not None:
+            get_interpreter_pool().release(interpreter, healthy=interpreter_healthy)
 
 # API Routes
 @app.get("/")
 async def root():
     return {"message": "Analyze & Excel API", "version": "1.0.0"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: analysis stage timings and request latency"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
@@ -329,6 +413,9 @@ async def upload_file(file: UploadFile = File(...)):
         except:
             pass
         
+        # Statistics for previews are computed off the request path
+        schedule_profile(file_path)
+        
         return {"message": "File uploaded successfully", "file": file_info}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -431,6 +518,23 @@ async def preview_file(file_path: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/files/{file_path:path}/profile")
+async def profile_file(file_path: str):
+    """Summary statistics, missing values, dtypes, memory usage and correlations per sheet
+    Computed once per file version and stored next to the file's cached data.
+    """
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        profile = await asyncio.to_thread(get_file_profile, file_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "type": "csv" if file_path.endswith('.csv') else "excel",
+        "file_name": os.path.basename(file_path),
+        **profile
+    }
+
 @app.post("/api/files/preview")
 async def preview_files(request: PreviewFilesRequest):
     """Preview multiple files at once - returns preview data for all files"""
@@ -483,7 +587,7 @@ async def preview_files(request: PreviewFilesRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/analyze")
-async def analyze_files(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def analyze_files(request: AnalysisRequest):
     """Start analysis task"""
     api_key = load_api_key()
     if not api_key:
@@ -498,15 +602,10 @@ async def analyze_files(request: AnalysisRequest, background_tasks: BackgroundTa
     task_id = hashlib.md5(f"{request.prompt}{time.time()}".encode()).hexdigest()[:12]
     
     # Initialize task
-    analysis_tasks[task_id] = {
-        "status": "pending",
-        "progress": 0.0,
-        "prompt": request.prompt,
-        "file_paths": request.file_paths
-    }
+    task_store.create(task_id, status="pending", prompt=request.prompt, file_paths=request.file_paths)
     
-    # Start background task
-    background_tasks.add_task(
+    # Run on the shared analysis executor (queued when all workers are busy)
+    get_analysis_executor().submit(
         run_analysis,
         request.prompt,
         request.file_paths,
@@ -529,25 +628,25 @@ async def analyze_files_stream(request: AnalysisRequest):
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
     
-    async def generate_stream():
-        """Generator function for Server-Sent Events"""
+    # Generate task ID
+    task_id = hashlib.md5(f"{request.prompt}{time.time()}".encode()).hexdigest()[:12]
+    
+    # Initialize task
+    task_store.create(task_id, status="running", prompt=request.prompt, file_paths=request.file_paths)
+    
+    async def generate_events():
+        """Generator of the analysis events (status, progress, output, result, error)"""
+        interpreter = None
+        interpreter_thread = None
+        task_log = None
+        timer = StageTimer("stream")
         try:
-            # Generate task ID
-            task_id = hashlib.md5(f"{request.prompt}{time.time()}".encode()).hexdigest()[:12]
-            
-            # Initialize task
-            analysis_tasks[task_id] = {
-                "status": "running",
-                "progress": 0.0,
-                "prompt": request.prompt,
-                "file_paths": request.file_paths
-            }
-            
             # Send initial status
-            yield f"data: {json.dumps({'type': 'status', 'task_id': task_id, 'status': 'running', 'progress': 0.0})}\n\n"
+            yield {'type': 'status', 'task_id': task_id, 'status': 'running', 'progress': 0.0}
             
-            # Get existing files
-            existing_files = get_existing_output_files(OUTPUT_FOLDER)
+            # Blocking work runs in worker threads so the event loop stays free for other streams
+            with timer.stage("output_scan"):
+                output_mark = await asyncio.to_thread(get_output_catalog(OUTPUT_FOLDER).refresh)
             
             # Generate summary filename
             timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -555,13 +654,21 @@ async def analyze_files_stream(request: AnalysisRequest):
             summary_filename = f"summary_{timestamp}_{prompt_hash}.txt"
             summary_filepath = os.path.join(OUTPUT_FOLDER, summary_filename)
             
-            # Configure interpreter
+            # Take a warm interpreter from the pool and configure it
+            with timer.stage("acquire_interpreter"):
+                interpreter = await asyncio.to_thread(get_interpreter_pool().acquire)
             interpreter.api_key = api_key
             interpreter.auto_run = True
             interpreter.verbose = False
             
+            # Pre-load the parsed files into the interpreter's Python kernel
+            with timer.stage("seed_kernel"):
+                preloaded_description = await asyncio.to_thread(seed_interpreter_kernel, interpreter, request.file_paths)
+            preloaded_instructions = get_preloaded_instructions(preloaded_description)
+            
             # Create context
-            file_context = get_file_context(request.file_paths)
+            with timer.stage("file_context"):
+                file_context = await asyncio.to_thread(get_file_context, request.file_paths, request.prompt)
             file_paths_str = "\n".join([f"  - {fp}" for fp in request.file_paths])
             
             system_context = f"""You are an expert data analyst working with Excel and CSV files.
@@ -571,13 +678,14 @@ Available files:
 
 File paths (use these exact paths in your code):
 {file_paths_str}
+{preloaded_instructions}
 
 Output folder: {OUTPUT_FOLDER}
 
 IMPORTANT INSTRUCTIONS:
 1. When reading files, use the exact file paths provided above
 2. When saving results, save to: {OUTPUT_FOLDER}
-3. Use pandas (pd.read_excel, pd.read_csv) to read files
+3. Use the pre-loaded `sheets` DataFrames when available, otherwise use pandas (pd.read_excel, pd.read_csv) to read files
 4. Use df.to_excel() or df.to_csv() to save results
 5. Always use index=False when saving Excel files
 6. Provide clear explanations of what you're doing
@@ -602,30 +710,16 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
    - Any significant trends or changes identified
 11. DO NOT skip creating this summary file - it is required!"""
             
-            # Create a queue for streaming output
-            output_queue = queue.Queue()
-            output_buffer = io.StringIO()
-            old_stdout = sys.stdout
-            captured_output = []
-            
-            # Custom stdout that captures and queues output
-            class StreamingStdout:
-                def __init__(self, original_stdout, queue, buffer):
-                    self.original_stdout = original_stdout
-                    self.queue = queue
-                    self.buffer = buffer
-                
-                def write(self, text):
-                    if text:
-                        self.buffer.write(text)
-                        self.queue.put(text)
-                        captured_output.append(text)
-                
-                def flush(self):
-                    self.original_stdout.flush()
-            
-            streaming_stdout = StreamingStdout(old_stdout, output_queue, output_buffer)
-            sys.stdout = streaming_stdout
+            # Event channel pushing output from the interpreter thread to this response.
+            # Output goes into one shared buffer and is sent as coalesced frames (every 50 ms or 4 KB).
+            # The full output is spooled to the task's log file
+            channel = EventChannel()
+            task_log = TaskLog(task_id)
+            # Output is held back while the slowest client following the task's event log falls behind
+            streaming_output = CoalescingOutput(channel, task_log, backlog=lambda: channel.backlog() + event_log.lag())
+            profiler = CellProfiler(interpreter)
+            guard = CodeGuard(interpreter, request.file_paths if preloaded_instructions else None)
+            limits = ResourceLimits(interpreter, wall_seconds=request.timeout_seconds or 300)
             
             # Intercept functions that open windows
             import webbrowser
@@ -642,16 +736,14 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                 """Intercept webbrowser.open() calls and capture the URL instead"""
                 message = f"[Intercepted webbrowser.open() call - URL: {url}]\n"
                 message += "Note: Browser windows are disabled. Data is captured in the output instead.\n"
-                output_queue.put(message)
-                output_buffer.write(message)
+                streaming_output.write(message)
                 return False  # Don't actually open
             
             def intercepted_startfile(filepath, operation='open'):
                 """Intercept os.startfile() calls and capture the file path instead"""
                 message = f"[Intercepted os.startfile() call - File: {filepath}, Operation: {operation}]\n"
                 message += "Note: File opening is disabled. Please use the preview/download buttons instead.\n"
-                output_queue.put(message)
-                output_buffer.write(message)
+                streaming_output.write(message)
                 return None  # Don't actually open
             
             def intercepted_subprocess_call(*args, **kwargs):
@@ -665,8 +757,7 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                         if any(x in cmd_str for x in ['start', 'open', 'xdg-open', 'see']):
                             message = f"[Intercepted subprocess.call() that would open file: {cmd}]\n"
                             message += "Note: File opening is disabled. Please use the preview/download buttons instead.\n"
-                            output_queue.put(message)
-                            output_buffer.write(message)
+                            streaming_output.write(message)
                             return 0  # Return success but don't actually open
                 # For other subprocess calls, allow them but log
                 return original_subprocess_call(*args, **kwargs)
@@ -680,8 +771,7 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                     """Intercept DataFrame.to_html() calls"""
                     message = "[Intercepted DataFrame.to_html() call]\n"
                     message += "Note: HTML file creation is disabled. Use print(df) or df.head() to display data instead.\n"
-                    output_queue.put(message)
-                    output_buffer.write(message)
+                    streaming_output.write(message)
                     # Return empty string instead of HTML
                     return ""
                 
@@ -694,8 +784,8 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
             subprocess.call = intercepted_subprocess_call
             
             # Update progress
-            analysis_tasks[task_id]["progress"] = 0.3
-            yield f"data: {json.dumps({'type': 'progress', 'progress': 0.3})}\n\n"
+            await asyncio.to_thread(task_store.update, task_id, progress=0.3)
+            yield {'type': 'progress', 'progress': 0.3}
             
             # Run interpreter in a thread
             interpreter_result = [None]
@@ -706,23 +796,24 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
             
             def run_interpreter_thread():
                 try:
-                    if hasattr(interpreter, 'reset'):
-                        interpreter.reset()
-                    
-                    # Try to use streaming if available
-                    if hasattr(interpreter, 'chat_stream'):
-                        # Use streaming chat if available
-                        for chunk in interpreter.chat_stream(f"{system_context}\n\nUser request: {request.prompt}"):
-                            if chunk:
-                                output_queue.put(f"data: {json.dumps({'type': 'chunk', 'content': str(chunk)})}\n\n")
-                    else:
-                        # Fallback to regular chat
-                        result = interpreter.chat(f"{system_context}\n\nUser request: {request.prompt}")
-                        interpreter_result[0] = result
+                    # Only this thread's output is streamed (other analyses may be running)
+                    with capture_output(streaming_output):
+                        # Try to use streaming if available
+                        if hasattr(interpreter, 'chat_stream'):
+                            # Use streaming chat if available
+                            for chunk in interpreter.chat_stream(f"{system_context}\n\nUser request: {request.prompt}"):
+                                if chunk:
+                                    channel.publish({'type': 'chunk', 'content': str(chunk)})
+                        else:
+                            # Fallback to regular chat
+                            with timed_chat(interpreter, timer), limits.attach(), profiler.attach(), guard.attach():
+                                result = interpreter.chat(f"{system_context}\n\nUser request: {request.prompt}")
+                            interpreter_result[0] = result
                 except Exception as e:
                     interpreter_error[0] = e
                 finally:
-                    sys.stdout = old_stdout
+                    # Released here so a dropped client connection doesn't kill a running analysis
+                    get_interpreter_pool().release(interpreter, healthy=interpreter_error[0] is None)
                     # Restore original functions
                     try:
                         webbrowser.open = original_webbrowser_open
@@ -734,42 +825,22 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                             pd.DataFrame.to_html = original_to_html_outer
                     except:
                         pass
-                    output_queue.put(None)  # Signal completion
+                    streaming_output.close()  # Flush remaining output and signal completion
             
-            # Start interpreter thread
+            # Start interpreter thread (the blocking interpreter needs one while it runs)
             interpreter_thread = threading.Thread(target=run_interpreter_thread, daemon=True)
             interpreter_thread.start()
             
-            # Stream output while interpreter is running
-            last_output_time = time.time()
-            while interpreter_thread.is_alive() or not output_queue.empty():
-                try:
-                    # Get output with timeout
-                    chunk = output_queue.get(timeout=0.5)
-                    if chunk is None:
-                        break
-                    # Format as SSE message
-                    yield f"data: {json.dumps({'type': 'output', 'content': chunk})}\n\n"
-                    last_output_time = time.time()
-                except queue.Empty:
-                    # Check if thread is still alive
-                    if not interpreter_thread.is_alive():
-                        break
-                    # Send heartbeat
-                    if time.time() - last_output_time > 5:
-                        yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-                        last_output_time = time.time()
-            
-            # Wait for thread to complete
-            interpreter_thread.join(timeout=1)
+            # Pass output on as soon as it is published (heartbeats are added per client)
+            async for event in channel.subscribe(heartbeat_interval=None):
+                yield event
             
             # Check for errors
             if interpreter_error[0]:
                 raise interpreter_error[0]
             
             # Get final output
-            response_text = output_buffer.getvalue()
-            sys.stdout = old_stdout
+            response_text = task_log.tail()
             
             # Restore original functions
             try:
@@ -784,21 +855,20 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                 pass
             
             # Update progress
-            analysis_tasks[task_id]["progress"] = 0.8
-            yield f"data: {json.dumps({'type': 'progress', 'progress': 0.8})}\n\n"
+            await asyncio.to_thread(task_store.update, task_id, progress=0.8)
+            yield {'type': 'progress', 'progress': 0.8}
             
             # Check for newly generated files
-            generated_files = []
-            current_files = get_existing_output_files(OUTPUT_FOLDER)
-            for file_path in current_files:
-                if file_path not in existing_files:
-                    generated_files.append(file_path)
+            with timer.stage("output_scan"):
+                generated_files = await asyncio.to_thread(get_output_catalog(OUTPUT_FOLDER).added_since, output_mark)
+                await asyncio.to_thread(get_output_catalog(OUTPUT_FOLDER).assign, generated_files, task_id, prompt_hash)
             
             # Read summary file
             main_answer = ""
-            if os.path.exists(summary_filepath):
-                with open(summary_filepath, "r", encoding="utf-8") as f:
-                    main_answer = f.read().strip()
+            with timer.stage("summary"):
+                if os.path.exists(summary_filepath):
+                    with open(summary_filepath, "r", encoding="utf-8") as f:
+                        main_answer = f.read().strip()
             
             if not main_answer:
                 main_answer = "Analysis completed. Please check the generated files for results."
@@ -806,34 +876,142 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                     main_answer += f"\n\nGenerated files: {', '.join([os.path.basename(f) for f in generated_files])}"
             
             # Update task status
-            analysis_tasks[task_id]["status"] = "completed"
-            analysis_tasks[task_id]["progress"] = 1.0
-            analysis_tasks[task_id]["result"] = {
+            result = {
                 "main_answer": main_answer,
                 "intermediate_steps": response_text,
+                "log": task_log.reference(),
                 "generated_files": generated_files,
-                "answer_file": summary_filepath if os.path.exists(summary_filepath) else None
+                "answer_file": summary_filepath if os.path.exists(summary_filepath) else None,
+                "timings": timer.finish(),
+                "cells": profiler.cells,
+                "guard": guard.hits,
+                "resources": limits.usage()
             }
+            with timer.stage("store_result"):
+                await asyncio.to_thread(task_store.update, task_id, status="completed", progress=1.0, result=result)
             
             # Send final result
-            yield f"data: {json.dumps({'type': 'result', 'result': analysis_tasks[task_id]['result']})}\n\n"
-            yield f"data: {json.dumps({'type': 'status', 'status': 'completed', 'progress': 1.0})}\n\n"
+            yield {'type': 'result', 'result': result}
+            yield {'type': 'status', 'status': 'completed', 'progress': 1.0}
             
         except TimeoutError as e:
             error_msg = str(e)
-            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
-            if task_id in analysis_tasks:
-                analysis_tasks[task_id]["status"] = "error"
-                analysis_tasks[task_id]["error"] = error_msg
+            yield {'type': 'error', 'error': error_msg}
+            await asyncio.to_thread(task_store.update, task_id, status="error", error=error_msg)
+        except ResourceLimitExceeded as e:
+            error_msg = str(e)
+            yield {'type': 'error', 'error': error_msg, 'resources': limits.usage()}
+            await asyncio.to_thread(task_store.update, task_id, status="error", error=error_msg,
+                                    result={"resources": limits.usage(), "cells": profiler.cells})
         except Exception as e:
             error_msg = f"Error during execution: {str(e)}\n{traceback.format_exc()}"
-            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
-            if task_id in analysis_tasks:
-                analysis_tasks[task_id]["status"] = "error"
-                analysis_tasks[task_id]["error"] = error_msg
+            yield {'type': 'error', 'error': error_msg}
+            await asyncio.to_thread(task_store.update, task_id, status="error", error=error_msg)
+        finally:
+            # The interpreter thread releases the interpreter itself once started
+            if interpreter is not None and interpreter_thread is None:
+                get_interpreter_pool().release(interpreter, healthy=False)
+            if task_log is not None:
+                task_log.close()
+    
+    # The analysis writes to the task's event log independently of this response,
+    # so it completes even if the client disconnects and can be resumed via /api/tasks/{task_id}/events
+    event_log = create_task_event_log(task_id)
+    
+    async def run_pipeline():
+        try:
+            async for event in generate_events():
+                event_log.append(event)
+        finally:
+            event_log.close()
+    
+    pipeline = asyncio.create_task(run_pipeline())
+    stream_pipelines.add(pipeline)
+    pipeline.add_done_callback(stream_pipelines.discard)
+    
+    return event_stream_response(event_log, task_id)
+
+@app.get("/api/tasks/{task_id}/events")
+async def get_task_events(task_id: str, last_event_id: Optional[int] = None,
+                          last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """Resume a streamed task: replay the events after Last-Event-ID, then follow live events"""
+    event_log = task_event_logs.get(task_id)
+    if event_log is None:
+        raise HTTPException(status_code=404, detail="No event log for this task")
+    if last_event_id is None:
+        try:
+            last_event_id = int(last_event_id_header or 0)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return event_stream_response(event_log, task_id, last_event_id)
+
+@app.get("/api/tasks")
+def list_tasks(status: Optional[str] = None, session_id: Optional[str] = None, limit: int = 50):
+    """List recent analysis tasks (without results), optionally filtered by status or session"""
+    return {"tasks": task_store.list(status=status, session_id=session_id, limit=min(limit, 500))}
+
+def task_snapshot(task_id: str, task: Optional[dict]) -> dict:
+    """Status event for a watched task (the result is only included once the task is finished)"""
+    if task is None:
+        return {"type": "task", "task_id": task_id, "status": "not_found"}
+    return {
+        "type": "task",
+        "task_id": task_id,
+        "status": task["status"],
+        "progress": task.get("progress", 0.0),
+        "result": task.get("result") if task["status"] == "completed" else None,
+        "error": task.get("error")
+    }
+
+@app.get("/api/tasks/watch")
+async def watch_tasks(task_ids: str):
+    """Push status, progress and result changes of one or more tasks (comma-separated ids) as Server-Sent Events
+    The stream ends once every watched task is finished or unknown.
+    """
+    watched = [task_id for task_id in dict.fromkeys(task_ids.split(",")) if task_id][:MAX_WATCHED_TASKS]
+    if not watched:
+        raise HTTPException(status_code=400, detail="No task ids given")
+    
+    async def generate_updates():
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        
+        def on_task_update(task_id: str):
+            # Called from whichever thread updated the store
+            if task_id in watched:
+                try:
+                    loop.call_soon_threadsafe(changed.set)
+                except RuntimeError:
+                    pass
+        
+        task_store.add_listener(on_task_update)
+        last_sent = {}
+        last_event_time = time.time()
+        try:
+            while watched:
+                changed.clear()
+                for task_id in list(watched):
+                    snapshot = task_snapshot(task_id, await asyncio.to_thread(task_store.get, task_id))
+                    if snapshot != last_sent.get(task_id):
+                        last_sent[task_id] = snapshot
+                        last_event_time = time.time()
+                        yield f"data: {json.dumps(snapshot)}\n\n"
+                    if snapshot["status"] in ("completed", "error", "not_found"):
+                        watched.remove(task_id)
+                if not watched:
+                    break
+                try:
+                    # Woken by updates in this process; the timeout catches updates from other workers
+                    await asyncio.wait_for(changed.wait(), timeout=TASK_WATCH_INTERVAL)
+                except asyncio.TimeoutError:
+                    if time.time() - last_event_time >= 5:
+                        last_event_time = time.time()
+                        yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+        finally:
+            task_store.remove_listener(on_task_update)
     
     return StreamingResponse(
-        generate_stream(),
+        generate_updates(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -842,13 +1020,21 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
         }
     )
 
+@app.get("/api/tasks/{task_id}/log")
+def get_task_log(task_id: str, offset: int = 0, limit: int = TASK_LOG_PAGE_BYTES):
+    """Page through a task's full output log; continue from next_offset until eof"""
+    page = read_task_log(task_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Task log not found")
+    return page
+
 @app.get("/api/tasks/{task_id}")
-async def get_task_status(task_id: str):
+def get_task_status(task_id: str):
     """Get analysis task status"""
-    if task_id not in analysis_tasks:
+    task = task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = analysis_tasks[task_id]
     return {
         "task_id": task_id,
         "status": task["status"],
@@ -857,21 +1043,88 @@ async def get_task_status(task_id: str):
         "error": task.get("error")
     }
 
+@app.post("/api/sessions")
+def create_session(request: SessionRequest):
+    """Start a multi-turn analysis session that keeps its interpreter and kernel state between prompts"""
+    api_key = load_api_key()
+    if not api_key:
+        raise HTTPException(status_code=400, detail="OpenAI API key not found")
+    
+    for file_path in request.file_paths:
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+    
+    session = get_session_manager().create(request.file_paths)
+    return session.to_dict()
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Get session info"""
+    session = get_session_manager().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session.to_dict()
+
+@app.post("/api/sessions/{session_id}/messages")
+async def send_session_message(session_id: str, request: SessionMessageRequest):
+    """Send a prompt to a session; runs as an analysis task on the session's interpreter"""
+    session = get_session_manager().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    if not session.lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Session is busy with a previous message")
+    if session.closed:
+        # Closed (e.g. by the idle reaper) after it was looked up
+        session.lock.release()
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    session.touch()
+    
+    task_id = hashlib.md5(f"{request.prompt}{time.time()}".encode()).hexdigest()[:12]
+    task_store.create(task_id, status="pending", prompt=request.prompt, file_paths=session.file_paths,
+                      session_id=session_id)
+    
+    # The session lock is released by run_analysis when the turn finishes
+    get_analysis_executor().submit(
+        run_analysis,
+        request.prompt,
+        session.file_paths,
+        OUTPUT_FOLDER,
+        request.timeout_seconds or 300,
+        task_id,
+        session
+    )
+    
+    return {"task_id": task_id, "session_id": session_id, "status": "pending", "message": "Analysis started"}
+
+@app.delete("/api/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Close a session and release its interpreter"""
+    session = get_session_manager().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    # A busy kernel may still be executing code, so it is replaced rather than reused
+    get_session_manager().close(session_id, healthy=not session.lock.locked())
+    return {"message": "Session closed", "session_id": session_id}
+
 @app.get("/api/output")
-async def list_output_files():
-    """List all output files"""
-    files = []
-    if os.path.exists(OUTPUT_FOLDER):
-        for file in os.listdir(OUTPUT_FOLDER):
-            if file.endswith(('.xlsx', '.xls', '.csv', '.txt')):
-                file_path = os.path.join(OUTPUT_FOLDER, file)
-                files.append({
-                    "name": file,
-                    "path": file_path,
-                    "size": os.path.getsize(file_path),
-                    "modified": os.path.getmtime(file_path)
-                })
-    return {"files": sorted(files, key=lambda x: x["modified"], reverse=True)}
+async def list_output_files(limit: Optional[int] = None, cursor: Optional[str] = None, task_id: Optional[str] = None,
+                            file_type: Optional[str] = Query(None, alias="type")):
+    """List output files, most recently modified first
+    Without limit or cursor all files are returned. With either, a page (default 100 files) comes back
+    with next_cursor; pass it back as cursor for the next page.
+    Filter by the task that generated the files (task_id) or by extension (type, e.g. "xlsx").
+    """
+    paginated = limit is not None or cursor is not None
+    try:
+        files, next_cursor = await asyncio.to_thread(
+            get_output_catalog(OUTPUT_FOLDER).list, limit=(100 if limit is None else limit) if paginated else None,
+            cursor=cursor, task_id=task_id, file_type=file_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not paginated:
+        return {"files": files}
+    return {"files": files, "next_cursor": next_cursor}
 
 @app.get("/api/download/{file_path:path}")
 async def download_file(file_path: str):
@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from prometheus_client import Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST, multiprocess
+
+# Buckets (seconds) for analysis stages, from context building to multi-minute LLM runs
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Buckets (seconds) for HTTP request latency
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+ANALYSIS_STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds", "Time spent in each stage of an analysis run",
+    ["stage", "path"], buckets=STAGE_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS
+)
+
+class StageTimer:
+    """Times the stages of one analysis run
+    Each stage is added to the run's timings (repeated stages accumulate) and observed in the
+    analysis_stage_seconds histogram, labelled with the path (background, stream or streamlit).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timings = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        ANALYSIS_STAGE_SECONDS.labels(stage=stage, path=self.path).observe(seconds)
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def finish(self) -> dict:
+        """Record the total time and return all timings (seconds, rounded to ms)"""
+        self.record("total", time.perf_counter() - self._start)
+        with self._lock:
+            return {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+
+@contextmanager
+def timed_chat(interpreter, timer: StageTimer):
+    """Time an interpreter.chat() call, split into running generated code and the rest (waiting on the LLM)
+    Code execution is measured by wrapping interpreter.computer.run for the duration of the block.
+    """
+    computer = interpreter.computer
+    previous = computer.__dict__.get("run")
+    original_run = computer.run
+    code_seconds = [0.0]
+
+    def timed_stream(chunks):
+        elapsed = 0.0
+        try:
+            iterator = iter(chunks)
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                elapsed += time.perf_counter() - start
+                yield chunk
+        finally:
+            code_seconds[0] += elapsed
+
+    def timed_run(*args, **kwargs):
+        start = time.perf_counter()
+        result = original_run(*args, **kwargs)
+        if kwargs.get("stream"):
+            return timed_stream(result)
+        code_seconds[0] += time.perf_counter() - start
+        return result
+
+    computer.run = timed_run
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # Put back whatever was there before (the class method if nothing was)
+        if computer.__dict__.get("run") is timed_run:
+            if previous is None:
+                del computer.run
+            else:
+                computer.run = previous
+        elapsed = time.perf_counter() - start
+        timer.record("code_execution", code_seconds[0])
+        timer.record("llm", max(0.0, elapsed - code_seconds[0]))
+
+def render_metrics() -> bytes:
+    """Prometheus text format; aggregates all worker processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+class RequestMetricsMiddleware:
+    """ASGI middleware observing request latency per route template in http_request_duration_seconds
+    Server-Sent Event streams are skipped, their duration is the length of the analysis.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        response = {"status": 500, "stream": False, "observed": False}
+
+        def observe():
+            # Once per request, when the response is complete (background tasks run after that)
+            if response["observed"] or response["stream"]:
+                return
+            response["observed"] = True
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"], route=route, status=str(response["status"])
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers", []))
+                response["stream"] = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            observe()
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from typing import Optional
+from api.sqlite_store import SQLiteStore
+
+# SQLite catalog of output files, shared by the API workers and the Streamlit app on the host
+OUTPUT_CATALOG_PATH = os.getenv("OUTPUT_CATALOG_PATH", os.path.join(".output_catalog", "outputs.db"))
+# Output files are re-stat'ed this often to pick up files rewritten in place (seconds);
+# new and deleted files are picked up whenever the folder changes
+RESCAN_INTERVAL = int(os.getenv("OUTPUT_CATALOG_RESCAN_SECONDS", "300"))
+# File types listed as outputs
+OUTPUT_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.txt')
+# Largest page returned by list()
+MAX_PAGE_SIZE = 1000
+
+def _file_type(name: str) -> str:
+    return os.path.splitext(name)[1].lstrip('.').lower()
+
+def encode_cursor(modified: float, path: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([modified, path]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """(modified, path) of the last file of the previous page; ValueError for a malformed cursor"""
+    try:
+        modified, path = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(modified), str(path)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class OutputCatalog(SQLiteStore):
+    """Incrementally maintained index of the files in an output folder
+    refresh() only lists the folder when its modification time changed and only stats files it
+    hasn't seen (plus a full re-stat every RESCAN_INTERVAL seconds). Every added file gets an increasing
+    sequence number, so a task can ask for the files added since it started.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outputs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL UNIQUE,
+            folder TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            modified REAL NOT NULL,
+            type TEXT NOT NULL,
+            task_id TEXT,
+            prompt_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_outputs_modified ON outputs (folder, modified, path);
+        CREATE INDEX IF NOT EXISTS idx_outputs_task ON outputs (task_id, modified, path);
+        CREATE INDEX IF NOT EXISTS idx_outputs_type ON outputs (folder, type, modified, path);
+    """
+
+    def __init__(self, folder: str, path: str = OUTPUT_CATALOG_PATH):
+        self.folder = folder
+        self._refresh_lock = threading.Lock()
+        self._folder_mtime = None
+        self._last_rescan = 0.0
+        super().__init__(path)
+
+    def _scan_names(self) -> set:
+        names = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(OUTPUT_EXTENSIONS) and entry.is_file():
+                    names.add(entry.name)
+        return names
+
+    def refresh(self, full: bool = False) -> int:
+        """Bring the catalog up to date with the folder and return the current sequence number"""
+        conn = self._connect()
+        with self._refresh_lock:
+            try:
+                folder_mtime = os.stat(self.folder).st_mtime_ns
+            except OSError:
+                folder_mtime = None
+            rescan = full or time.time() - self._last_rescan > RESCAN_INTERVAL
+            if folder_mtime is not None and (folder_mtime != self._folder_mtime or rescan):
+                # The folder time is read before listing, so files added meanwhile trigger the next refresh
+                self._sync(conn, self._scan_names(), rescan)
+                self._folder_mtime = folder_mtime
+                if rescan:
+                    self._last_rescan = time.time()
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM outputs").fetchone()[0]
+
+    def _sync(self, conn: sqlite3.Connection, names: set, rescan: bool):
+        known = {row["name"]: row for row in conn.execute(
+            "SELECT name, size, modified FROM outputs WHERE folder = ?", (self.folder,)
+        )}
+        added, updated = [], []
+        for name in names:
+            if name in known and not rescan:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            row = known.get(name)
+            if row is None:
+                added.append((os.path.join(self.folder, name), self.folder, name, stat.st_size, stat.st_mtime, _file_type(name)))
+            elif row["size"] != stat.st_size or row["modified"] != stat.st_mtime:
+                updated.append((stat.st_size, stat.st_mtime, os.path.join(self.folder, name)))
+        removed = [(os.path.join(self.folder, name),) for name in set(known) - names]
+        conn.execute("BEGIN")
+        try:
+            # Another process may have added the same file first
+            conn.executemany("INSERT OR IGNORE INTO outputs (path, folder, name, size, modified, type) VALUES (?, ?, ?, ?, ?, ?)", added)
+            conn.executemany("UPDATE outputs SET size = ?, modified = ? WHERE path = ?", updated)
+            conn.executemany("DELETE FROM outputs WHERE path = ?", removed)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def added_since(self, seq: int) -> list:
+        """Paths of the files added after refresh() returned seq, oldest first"""
+        self.refresh()
+        rows = self._connect().execute(
+            "SELECT path FROM outputs WHERE folder = ? AND seq > ? ORDER BY seq", (self.folder, seq)
+        ).fetchall()
+        return [row["path"] for row in rows]
+
+    def assign(self, paths: list, task_id: str, prompt_hash: Optional[str] = None):
+        """Record the task (and prompt hash) that generated files not claimed by another task"""
+        self._connect().executemany(
+            "UPDATE outputs SET task_id = ?, prompt_hash = ? WHERE path = ? AND task_id IS NULL",
+            [(task_id, prompt_hash, path) for path in paths]
+        )
+
+    def list(self, limit: Optional[int] = 100, cursor: Optional[str] = None, task_id: Optional[str] = None,
+             file_type: Optional[str] = None) -> tuple:
+        """A page of output files, most recently modified first, and the cursor of the next page (None at the end)
+        limit=None returns every remaining file.
+        """
+        self.refresh()
+        conditions = ["folder = ?"]
+        params = [self.folder]
+        if task_id:
+            conditions.append("task_id = ?")
+            params.append(task_id)
+        if file_type:
+            conditions.append("type = ?")
+            params.append(file_type.lstrip('.').lower())
+        if cursor:
+            modified, path = decode_cursor(cursor)
+            conditions.append("(modified < ? OR (modified = ? AND path < ?))")
+            params.extend([modified, modified, path])
+        query = (f"SELECT name, path, size, modified, type, task_id, prompt_hash FROM outputs WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY modified DESC, path DESC")
+        if limit is None:
+            return [dict(row) for row in self._connect().execute(query, params)], None
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        rows = self._connect().execute(f"{query} LIMIT ?", params + [limit + 1]).fetchall()
+        files = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(files[-1]["modified"], files[-1]["path"]) if len(rows) > limit else None
+        return files, next_cursor
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_output_catalog(folder: str) -> OutputCatalog:
+    """Process-wide catalog of an output folder"""
+    with _catalogs_lock:
+        if folder not in _catalogs:
+            _catalogs[folder] = OutputCatalog(folder)
+        return _catalogs[folder]
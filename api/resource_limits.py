@@ -0,0 +1,239 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# CPU seconds the generated code of one task may use (0 = no limit)
+TASK_CPU_SECONDS = int(os.getenv("TASK_CPU_SECONDS", "600"))
+# Memory (MB) one task may allocate in the kernel on top of what it already used (0 = no limit)
+TASK_MEMORY_MB = int(os.getenv("TASK_MEMORY_MB", "4096"))
+# How often the kernel's CPU time and memory are sampled (seconds)
+RESOURCE_POLL_INTERVAL = 0.5
+# Seconds an interrupted kernel gets to stop before it is killed
+INTERRUPT_GRACE_SECONDS = 5
+
+class ResourceLimitExceeded(Exception):
+    """A task used more CPU time, memory or wall-clock time than allowed"""
+
+class _StopRun(KeyboardInterrupt):
+    """Ends interpreter.chat() from inside computer.run (Open Interpreter only lets KeyboardInterrupt through)"""
+
+def get_kernel_process(interpreter) -> Optional[psutil.Process]:
+    """The process of the interpreter's Python kernel, None if it isn't running"""
+    try:
+        language = interpreter.computer.terminal._active_languages.get("python")
+        return psutil.Process(language.km.provisioner.pid)
+    except Exception:
+        return None
+
+def _peak_rss_mb(process: psutil.Process) -> float:
+    """Peak RSS since the counter was last reset (Linux), otherwise the current RSS"""
+    try:
+        with open(f"/proc/{process.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return process.memory_info().rss / (1024 * 1024)
+
+def _cpu_seconds(process: psutil.Process) -> float:
+    times = process.cpu_times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class ResourceLimits:
+    """CPU-time, memory and wall-clock limits for the code one task runs in the interpreter's kernel
+    The kernel gets RLIMIT_AS/RLIMIT_CPU soft limits (Linux) so a runaway allocation fails with MemoryError
+    instead of exhausting the host, and a watchdog thread samples CPU time and RSS. When a limit is exceeded
+    the running cell is interrupted (the kernel is killed if it doesn't stop), the chat ends and attach()
+    raises ResourceLimitExceeded.
+    """
+
+    def __init__(self, interpreter, wall_seconds: Optional[float] = None,
+                 cpu_seconds: int = TASK_CPU_SECONDS, memory_mb: int = TASK_MEMORY_MB):
+        self.interpreter = interpreter
+        self.wall_seconds = wall_seconds or 0
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.exceeded = None
+        self._process = None
+        self._start = None
+        self._cpu_start = 0.0
+        self._rss_start = 0.0
+        self._cpu_used = 0.0
+        self._peak_rss = 0.0
+        self._previous_limits = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        process = self._process
+        if process is None:
+            return
+        try:
+            cpu = _cpu_seconds(process) - self._cpu_start
+            peak = max(_peak_rss_mb(process), process.memory_info().rss / (1024 * 1024))
+        except psutil.Error:
+            return
+        with self._lock:
+            self._cpu_used = max(self._cpu_used, cpu)
+            self._peak_rss = max(self._peak_rss, peak)
+
+    def _check(self):
+        elapsed = time.monotonic() - self._start
+        if self.wall_seconds and elapsed > self.wall_seconds:
+            self._trip(f"Wall-clock limit exceeded: the analysis ran for {elapsed:.0f} s (limit {self.wall_seconds:.0f} s)")
+        elif self.cpu_seconds and self._cpu_used > self.cpu_seconds:
+            self._trip(f"CPU time limit exceeded: the generated code used {self._cpu_used:.1f} s of CPU "
+                       f"(limit {self.cpu_seconds} s, TASK_CPU_SECONDS)")
+        elif self.memory_mb and self._peak_rss - self._rss_start > self.memory_mb:
+            self._trip(f"Memory limit exceeded: the generated code used {self._peak_rss:.0f} MB "
+                       f"(limit {self.memory_mb} MB over the {self._rss_start:.0f} MB the kernel started with, TASK_MEMORY_MB)")
+
+    def _trip(self, message: str):
+        with self._lock:
+            if self.exceeded is not None:
+                return
+            self.exceeded = ResourceLimitExceeded(message)
+        # Ends the running cell (Open Interpreter interrupts the kernel), then make sure it really stops
+        try:
+            self.interpreter.computer.terminal.stop()
+        except Exception:
+            pass
+        threading.Thread(target=self._kill_if_busy, daemon=True).start()
+
+    def _kill_if_busy(self):
+        process = self._process
+        if process is None:
+            return
+        try:
+            cpu = _cpu_seconds(process)
+            time.sleep(INTERRUPT_GRACE_SECONDS)
+            if _cpu_seconds(process) - cpu > INTERRUPT_GRACE_SECONDS / 2:
+                process.kill()
+        except psutil.Error:
+            pass
+
+    def _watch(self):
+        while not self._stop.wait(RESOURCE_POLL_INTERVAL):
+            self._sample()
+            self._check()
+
+    def _set_kernel_limits(self):
+        """Soft limits relative to what the kernel already uses; the hard limits are left alone"""
+        if resource is None or not hasattr(resource, "prlimit") or self._process is None:
+            return
+        try:
+            pid = self._process.pid
+            if self.memory_mb:
+                address_space = self._process.memory_info().vms + self.memory_mb * 1024 * 1024
+                self._set_limit(pid, resource.RLIMIT_AS, address_space)
+            if self.cpu_seconds:
+                # Backstop for the watchdog: SIGXCPU ends the kernel a bit after the limit
+                cpu = int(_cpu_seconds(self._process)) + self.cpu_seconds + INTERRUPT_GRACE_SECONDS * 2
+                self._set_limit(pid, resource.RLIMIT_CPU, cpu)
+        except (OSError, ValueError, psutil.Error):
+            pass
+
+    def _set_limit(self, pid: int, kind: int, soft: int):
+        previous = resource.prlimit(pid, kind)
+        hard = previous[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.prlimit(pid, kind, (soft, hard))
+        self._previous_limits[kind] = previous
+
+    def _restore_kernel_limits(self):
+        for kind, previous in self._previous_limits.items():
+            try:
+                resource.prlimit(self._process.pid, kind, previous)
+            except (OSError, ValueError, psutil.Error):
+                pass
+        self._previous_limits = {}
+
+    def usage(self) -> dict:
+        """Resources the task used, stored with the task result"""
+        with self._lock:
+            return {
+                "cpu_seconds": round(self._cpu_used, 3),
+                "peak_rss_mb": round(self._peak_rss, 1),
+                "wall_seconds": round(time.monotonic() - self._start, 3) if self._start else 0.0,
+                "limits": {
+                    "cpu_seconds": self.cpu_seconds or None,
+                    "memory_mb": self.memory_mb or None,
+                    "wall_seconds": self.wall_seconds or None
+                }
+            }
+
+    def _limited_stream(self, chunks):
+        try:
+            for chunk in chunks:
+                if self.memory_mb and chunk.get("format") == "output" and "MemoryError" in str(chunk.get("content", "")):
+                    self._trip(f"Memory limit exceeded: the generated code tried to allocate more than "
+                               f"{self.memory_mb} MB (TASK_MEMORY_MB)")
+                yield chunk
+        finally:
+            self._sample()
+        if self.exceeded is not None:
+            raise _StopRun()
+
+    @contextmanager
+    def attach(self):
+        """Enforce the limits while the block runs by wrapping interpreter.computer.run
+        Raises ResourceLimitExceeded at the end of the block if a limit was exceeded.
+        """
+        computer = self.interpreter.computer
+        previous = computer.__dict__.get("run")
+        original_run = computer.run
+
+        def limited_run(language, code, *args, **kwargs):
+            if self.exceeded is not None:
+                # No more code (not even probes) runs in a kernel that hit a limit
+                if kwargs.get("stream"):
+                    raise _StopRun()
+                return []
+            result = original_run(language, code, *args, **kwargs)
+            if kwargs.get("stream"):
+                return self._limited_stream(result)
+            self._sample()
+            return result
+
+        self._process = get_kernel_process(self.interpreter)
+        self._start = time.monotonic()
+        if self._process is not None:
+            try:
+                self._cpu_start = _cpu_seconds(self._process)
+                self._rss_start = self._process.memory_info().rss / (1024 * 1024)
+            except psutil.Error:
+                self._process = None
+        self._set_kernel_limits()
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        computer.run = limited_run
+        watcher.start()
+        try:
+            yield self
+        except _StopRun:
+            pass
+        except Exception:
+            # Errors caused by stopping the kernel are reported as the exceeded limit
+            if self.exceeded is None:
+                raise
+        finally:
+            self._stop.set()
+            self._sample()
+            if computer.__dict__.get("run") is limited_run:
+                if previous is None:
+                    del computer.run
+                else:
+                    computer.run = previous
+            if self.exceeded is None:
+                self._restore_kernel_limits()
+        if self.exceeded is not None:
+            raise self.exceeded
@@ -0,0 +1,86 @@
+import os
+import re
+import json
+import threading
+from typing import Optional
+from api.data_cache import load_sheets, prefetch_sheets, file_version, CSV_SHEET_NAME
+
+# Folder with one JSON snapshot per Streamlit conversation
+SNAPSHOT_FOLDER = os.getenv("SESSION_SNAPSHOT_FOLDER", ".session_snapshots")
+SNAPSHOT_FORMAT = 1
+
+# Last snapshot written per id, so unchanged sessions aren't rewritten on every rerun
+_last_saved = {}
+_snapshot_lock = threading.Lock()
+
+def is_valid_snapshot_id(snapshot_id) -> bool:
+    """Snapshot ids come from the URL, so only plain names are accepted as file names"""
+    return isinstance(snapshot_id, str) and re.fullmatch(r"[A-Za-z0-9_-]+", snapshot_id) is not None
+
+def _snapshot_path(snapshot_id: str) -> str:
+    if not is_valid_snapshot_id(snapshot_id):
+        raise ValueError(f"Invalid snapshot id: {snapshot_id}")
+    return os.path.join(SNAPSHOT_FOLDER, f"{snapshot_id}.json")
+
+def save_snapshot(snapshot_id: str, state: dict, frames: dict) -> bool:
+    """Write a session snapshot if it changed since the last save, returns whether it was written
+    state holds JSON-serializable session values. frames ({file_path: DataFrame or {sheet_name: DataFrame}})
+    are stored by file version only; their data is already in the file's columnar sidecars.
+    """
+    entries = {}
+    for file_path, data in frames.items():
+        try:
+            entries[file_path] = {"version": file_version(file_path), "sheets": isinstance(data, dict)}
+        except OSError:
+            continue
+    text = json.dumps({"format": SNAPSHOT_FORMAT, "state": state, "frames": entries}, sort_keys=True, default=str)
+    with _snapshot_lock:
+        if _last_saved.get(snapshot_id) == text:
+            return False
+        path = _snapshot_path(snapshot_id)
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        # Written under a temporary name so a crash never leaves half a snapshot
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        _last_saved[snapshot_id] = text
+    return True
+
+def load_snapshot(snapshot_id: str) -> Optional[dict]:
+    """Session values of a snapshot plus "processed_dataframes", None if there is no snapshot
+    DataFrames are read back from the columnar sidecars (in parallel); files that changed or
+    disappeared since the snapshot are left out and loaded again when they are viewed.
+    """
+    try:
+        with open(_snapshot_path(snapshot_id), "r", encoding="utf-8") as f:
+            text = f.read()
+        snapshot = json.loads(text)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    current = {}
+    for file_path, entry in snapshot["frames"].items():
+        try:
+            if file_version(file_path) == entry["version"]:
+                current[file_path] = entry
+                prefetch_sheets(file_path)
+        except OSError:
+            pass
+
+    frames = {}
+    for file_path, entry in current.items():
+        try:
+            sheets = load_sheets(file_path)
+        except Exception:
+            continue
+        if entry["sheets"]:
+            frames[file_path] = dict(sheets)
+        elif sheets:
+            frames[file_path] = sheets.get(CSV_SHEET_NAME, next(iter(sheets.values())))
+
+    with _snapshot_lock:
+        _last_saved[snapshot_id] = text
+    return {**snapshot["state"], "processed_dataframes": frames}
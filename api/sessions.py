@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+import threading
+from typing import List, Optional
+from api.interpreter_pool import get_interpreter_pool
+
+# Sessions idle for longer than this are closed and their kernels released
+SESSION_IDLE_TIMEOUT = int(os.getenv("SESSION_IDLE_TIMEOUT", "900"))
+# How often idle sessions are checked
+REAPER_INTERVAL = 30
+
+class AnalysisSession:
+    """Multi-turn analysis session that keeps one interpreter and its kernel state alive across turns"""
+
+    def __init__(self, file_paths: List[str]):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.file_paths = list(file_paths)
+        self.interpreter = get_interpreter_pool().acquire()
+        self.turns = 0
+        self.created = time.time()
+        self.last_used = self.created
+        self.closed = False
+        # Only one turn runs at a time per session
+        self.lock = threading.Lock()
+
+    def touch(self):
+        """Mark the session as used now"""
+        self.last_used = time.time()
+
+    def is_idle(self, idle_timeout: int) -> bool:
+        """Check if the session has been unused for longer than idle_timeout
+        Only meaningful while holding self.lock, which a running turn keeps.
+        """
+        return time.time() - self.last_used > idle_timeout
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "file_paths": self.file_paths,
+            "turns": self.turns,
+            "created": self.created,
+            "last_used": self.last_used,
+            "busy": self.lock.locked()
+        }
+
+class SessionManager:
+    """Registry of open analysis sessions with idle-timeout cleanup"""
+
+    def __init__(self, idle_timeout: int = SESSION_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+
+    def create(self, file_paths: List[str]) -> AnalysisSession:
+        session = AnalysisSession(file_paths)
+        with self._lock:
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str, healthy: bool = True) -> bool:
+        """Close a session and return its interpreter to the pool
+        Pass healthy=False when the kernel may still be running code (e.g. after a timeout).
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.closed = True
+        get_interpreter_pool().release(session.interpreter, healthy=healthy)
+        return True
+
+    def list(self) -> List[AnalysisSession]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(REAPER_INTERVAL)
+            for session in self.list():
+                # Holding the session lock keeps a turn from starting while the session is closed
+                if not session.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if session.is_idle(self.idle_timeout):
+                        self.close(session.session_id)
+                finally:
+                    session.lock.release()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_session_manager() -> SessionManager:
+    """Get the process-wide session manager, creating it on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager()
+        return _manager
+
+def get_followup_context(output_folder: str, summary_filepath: str) -> str:
+    """Short context for follow-up turns; the full instructions were sent on the first turn"""
+    return f"""This is a follow-up request in the same analysis session.
+Your Python session still holds `sheets` and every variable and DataFrame you created earlier -
+reuse them and only compute what is new. Do not re-read the input files.
+Follow the same instructions and restrictions as before. Save results to: {output_folder}
+At the end, you MUST write a summary of this follow-up to: '{summary_filepath}'
+   with open(r'{summary_filepath}', 'w', encoding='utf-8') as f:
+       f.write('Your summary content here')"""
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+class SQLiteStore:
+    """Base class of the stores kept in a SQLite database (WAL mode), safe to share between processes and threads
+    Subclasses set SCHEMA; its tables are created when the store is opened.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import time
+import hashlib
+
+# Set LLM_BACKEND=stub to replace interpreter.chat with the offline stand-in
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+# Optional JSON file with the scripted steps to replay
+LLM_STUB_SCRIPT = os.getenv("LLM_STUB_SCRIPT")
+# Delay before each step (seconds), like waiting for the model to start answering
+LLM_STUB_DELAY = float(os.getenv("LLM_STUB_DELAY", "0.0"))
+# Delay between streamed words of a message (seconds), like token streaming
+LLM_STUB_TOKEN_DELAY = float(os.getenv("LLM_STUB_TOKEN_DELAY", "0.0"))
+
+# Default script: inspect the pre-loaded data, save a result file and write the summary.
+# Placeholders are filled from the prompt: {output_folder}, {summary_filepath}, {prompt_hash}
+DEFAULT_SCRIPT = [
+    {"type": "message", "content": "Загружаю данные и проверяю структуру файлов."},
+    {"type": "code", "code": (
+        "try:\n"
+        "    _stub_frames = [df for file_sheets in sheets.values() for df in file_sheets.values()]\n"
+        "except NameError:\n"
+        "    _stub_frames = []\n"
+        "for _stub_df in _stub_frames:\n"
+        "    print(_stub_df.shape)\n"
+    )},
+    {"type": "message", "content": "Сохраняю результат в выходную папку."},
+    {"type": "code", "code": (
+        "import os\n"
+        "_stub_result = pd.DataFrame({'sheet': range(len(_stub_frames)), 'rows': [len(df) for df in _stub_frames]})\n"
+        "_stub_result.to_csv(os.path.join(r'{output_folder}', 'stub_result_{prompt_hash}.csv'), index=False)\n"
+        "with open(r'{summary_filepath}', 'w', encoding='utf-8') as f:\n"
+        "    f.write('Stub analysis: ' + str(len(_stub_frames)) + ' sheet(s) processed')\n"
+    )},
+    {"type": "message", "content": "Анализ завершен."},
+]
+
+def is_stub_backend_enabled() -> bool:
+    return LLM_BACKEND.lower() == "stub"
+
+def load_script() -> list:
+    """Load scripted steps from LLM_STUB_SCRIPT, or the default script"""
+    if LLM_STUB_SCRIPT:
+        with open(LLM_STUB_SCRIPT, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_SCRIPT
+
+def _prompt_placeholders(message: str) -> dict:
+    """Extract output folder and summary path from the system context so scripts can use them"""
+    output_folder = re.search(r"(?:Output folder|Save results to): (.+)", message)
+    summary_filepath = re.search(r"to: '([^']+\.txt)'", message)
+    return {
+        "output_folder": output_folder.group(1).strip() if output_folder else "output",
+        "summary_filepath": summary_filepath.group(1) if summary_filepath else os.path.join("output", "summary_stub.txt"),
+        "prompt_hash": hashlib.md5(message.encode()).hexdigest()[:8]
+    }
+
+def _fill(text: str, placeholders: dict) -> str:
+    for key, value in placeholders.items():
+        text = text.replace("{" + key + "}", value)
+    return text
+
+class StubChat:
+    """Deterministic stand-in for interpreter.chat
+    Replays scripted assistant messages and code cells; code runs on the interpreter's real kernel,
+    so execution, file detection and output capture behave as in a real run.
+    """
+
+    def __init__(self, interpreter, script: list = None, delay: float = None, token_delay: float = None):
+        self.interpreter = interpreter
+        self.script = script if script is not None else load_script()
+        self.delay = LLM_STUB_DELAY if delay is None else delay
+        self.token_delay = LLM_STUB_TOKEN_DELAY if token_delay is None else token_delay
+
+    def _stream(self, message: str):
+        placeholders = _prompt_placeholders(message or "")
+        self.interpreter.messages.append({"role": "user", "type": "message", "content": message})
+        for step in self.script:
+            time.sleep(step.get("delay", self.delay))
+            if step["type"] == "message":
+                content = _fill(step["content"], placeholders)
+                words = content.split(" ")
+                for index, word in enumerate(words):
+                    if self.token_delay:
+                        time.sleep(self.token_delay)
+                    yield {"role": "assistant", "type": "message",
+                           "content": word if index == len(words) - 1 else word + " "}
+                self.interpreter.messages.append({"role": "assistant", "type": "message", "content": content})
+            elif step["type"] == "code":
+                code = _fill(step["code"], placeholders)
+                yield {"role": "assistant", "type": "code", "format": "python", "content": code}
+                self.interpreter.messages.append({"role": "assistant", "type": "code", "format": "python", "content": code})
+                output = ""
+                for chunk in self.interpreter.computer.run("python", code, stream=True):
+                    if chunk.get("format") == "active_line" or not chunk.get("content"):
+                        continue
+                    output += str(chunk["content"])
+                    yield {"role": "computer", "type": "console", "format": "output", "content": chunk["content"]}
+                self.interpreter.messages.append({"role": "computer", "type": "console", "format": "output", "content": output})
+
+    def __call__(self, message=None, display=True, stream=False, blocking=True):
+        if stream:
+            return self._stream(message)
+        for chunk in self._stream(message):
+            if display:
+                if chunk["type"] == "code":
+                    print(f"\n```python\n{chunk['content']}\n```\n")
+                else:
+                    print(chunk["content"], end="")
+        return self.interpreter.messages
+
+def install_backend(interpreter):
+    """Replace interpreter.chat with the stub when LLM_BACKEND=stub"""
+    if is_stub_backend_enabled():
+        interpreter.chat = StubChat(interpreter)
+    return interpreter
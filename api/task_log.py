@@ -0,0 +1,212 @@
+import io
+import os
+import re
+import time
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+# Captured interpreter output is spooled to one file per task in this folder
+TASK_LOG_FOLDER = os.getenv("TASK_LOG_FOLDER", ".task_logs")
+# Characters of output kept in memory and returned with the result
+TASK_LOG_TAIL_CHARS = int(os.getenv("TASK_LOG_TAIL_CHARS", "20000"))
+# Log files are deleted this long after they were last written (seconds)
+TASK_LOG_MAX_AGE = int(os.getenv("TASK_LOG_MAX_AGE", os.getenv("TASK_TTL_SECONDS", "86400")))
+# Default and maximum page size of read_task_log (bytes)
+TASK_LOG_PAGE_BYTES = 256 * 1024
+# Old logs are swept at most this often (seconds)
+CLEANUP_INTERVAL = 600
+# Output is flushed to the file at least this often, so running tasks can be followed (seconds)
+FLUSH_INTERVAL = 0.5
+
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+def get_task_log_path(task_id: str, folder: str = TASK_LOG_FOLDER) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", task_id):
+        raise ValueError(f"Invalid task id: {task_id}")
+    return os.path.join(folder, f"{task_id}.log")
+
+def cleanup_task_logs(folder: str = TASK_LOG_FOLDER, max_age: int = TASK_LOG_MAX_AGE) -> int:
+    """Delete log files not written for max_age seconds, returns how many were deleted"""
+    removed = 0
+    cutoff = time.time() - max_age
+    if not os.path.isdir(folder):
+        return 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if name.endswith(".log") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _maybe_cleanup(folder: str):
+    global _last_cleanup
+    with _cleanup_lock:
+        if time.time() - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = time.time()
+    cleanup_task_logs(folder)
+
+class TaskLog(io.TextIOBase):
+    """Stdout replacement that appends all output to the task's log file and keeps only the tail in memory
+    write() may be called from any thread.
+    """
+
+    def __init__(self, task_id: str, folder: str = TASK_LOG_FOLDER, tail_chars: int = TASK_LOG_TAIL_CHARS):
+        os.makedirs(folder, exist_ok=True)
+        _maybe_cleanup(folder)
+        self.task_id = task_id
+        self.path = get_task_log_path(task_id, folder)
+        self.tail_chars = tail_chars
+        self.chars_written = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._tail = deque()
+        self._tail_length = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not text:
+            return 0
+        with self._lock:
+            if self._file.closed:
+                return 0
+            self._file.write(text)
+            self.chars_written += len(text)
+            self._tail.append(text)
+            self._tail_length += len(text)
+            # Drop whole chunks that are entirely outside the tail window
+            while self._tail and self._tail_length - len(self._tail[0]) >= self.tail_chars:
+                self._tail_length -= len(self._tail.popleft())
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        super().close()
+
+    @property
+    def truncated(self) -> bool:
+        return self.chars_written > self.tail_chars
+
+    def tail(self) -> str:
+        """Last tail_chars characters of output, with a marker if earlier output was left out"""
+        with self._lock:
+            text = "".join(self._tail)[-self.tail_chars:]
+            omitted = self.chars_written - len(text)
+        if omitted > 0:
+            text = f"[... {omitted} earlier characters are in the full log ...]\n" + text
+        return text
+
+    def reference(self) -> dict:
+        """Pointer to the full log, stored with the task result"""
+        self.flush()
+        return {
+            "path": self.path,
+            "size": os.path.getsize(self.path),
+            "chars": self.chars_written,
+            "truncated": self.truncated
+        }
+
+class ThreadOutput(io.TextIOBase):
+    """sys.stdout replacement that sends each thread's output to the stream the thread captures it to
+    Threads that don't capture anything write to the original stdout, so analyses running at the same
+    time don't swap each other's output.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self._local = threading.local()
+
+    def writable(self) -> bool:
+        return True
+
+    @property
+    def target(self):
+        return getattr(self._local, "stream", None) or self.original
+
+    def write(self, text: str) -> int:
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+_thread_output = None
+_thread_output_lock = threading.Lock()
+
+@contextmanager
+def capture_output(stream):
+    """Send what the current thread prints to stream for the duration of the block"""
+    global _thread_output
+    with _thread_output_lock:
+        if _thread_output is None or sys.stdout is not _thread_output:
+            _thread_output = ThreadOutput(sys.stdout)
+            sys.stdout = _thread_output
+        router = _thread_output
+    previous = getattr(router._local, "stream", None)
+    router._local.stream = stream
+    try:
+        yield stream
+    finally:
+        router._local.stream = previous
+
+def read_task_log(task_id: str, offset: int = 0, limit: int = TASK_LOG_PAGE_BYTES,
+                  folder: str = TASK_LOG_FOLDER) -> Optional[dict]:
+    """Read a page of a task's log starting at byte offset; None if the task has no log
+    Pages never split a UTF-8 character: next_offset is where the next page starts.
+    """
+    try:
+        path = get_task_log_path(task_id, folder)
+    except ValueError:
+        return None
+    if not os.path.exists(path):
+        return None
+    # At least one whole character (up to 4 bytes) fits into a page
+    limit = max(4, min(limit, TASK_LOG_PAGE_BYTES))
+    size = os.path.getsize(path)
+    offset = max(0, min(offset, size))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(limit)
+    # Skip continuation bytes if the offset points into the middle of a character
+    start = 0
+    while start < len(data) and start < 3 and 0x80 <= data[start] <= 0xBF:
+        start += 1
+    # Leave an incomplete trailing character for the next page
+    end = len(data)
+    for cut in range(0, min(4, len(data) - start + 1)):
+        try:
+            content = data[start:len(data) - cut].decode("utf-8")
+            end = len(data) - cut
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        content = data[start:].decode("utf-8", errors="replace")
+    next_offset = offset + end
+    return {
+        "task_id": task_id,
+        "offset": offset,
+        "next_offset": next_offset,
+        "size": size,
+        "eof": next_offset >= size,
+        "content": content
+    }
@@ -0,0 +1,357 @@
+import os
+import json
+import time
+import sqlite3
+import fnmatch
+import threading
+from typing import Optional
+from api.sqlite_store import SQLiteStore
+
+# Task store backend: "sqlite" (default), "redis", or "memory" (Redis store on an in-process stand-in)
+TASK_STORE = os.getenv("TASK_STORE", "sqlite")
+# SQLite database file, shared by all API worker processes on the host
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", os.path.join(".task_store", "tasks.db"))
+# Redis (or Redis-compatible server) used when TASK_STORE=redis
+TASK_STORE_URL = os.getenv("TASK_STORE_URL", "redis://localhost:6379/0")
+# Tasks are deleted this long after their last update (seconds)
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "86400"))
+# Expired tasks are swept at most this often (seconds)
+EVICTION_INTERVAL = 60
+
+# Fields a task can have; file_paths and result are stored as JSON
+TASK_FIELDS = ("status", "progress", "prompt", "file_paths", "session_id", "result", "error")
+JSON_FIELDS = ("file_paths", "result")
+# Fields returned by list() (results are only loaded for a single task)
+SUMMARY_FIELDS = ("task_id", "status", "progress", "prompt", "session_id", "error", "created_at", "updated_at")
+
+def _check_fields(fields: dict):
+    unknown = set(fields) - set(TASK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown task fields: {', '.join(sorted(unknown))}")
+
+class TaskListeners:
+    """Callbacks notified with the task id whenever a task is created, updated or deleted in this process
+    Updates made by other worker processes are not seen here; watchers re-read the store for those.
+    """
+
+    def _listeners(self) -> list:
+        if not hasattr(self, "_listener_list"):
+            self._listener_list = []
+        return self._listener_list
+
+    def add_listener(self, callback):
+        self._listeners().append(callback)
+
+    def remove_listener(self, callback):
+        try:
+            self._listeners().remove(callback)
+        except ValueError:
+            pass
+
+    def _notify(self, task_id: str):
+        for callback in list(self._listeners()):
+            try:
+                callback(task_id)
+            except Exception:
+                pass
+
+class SQLiteTaskStore(TaskListeners, SQLiteStore):
+    """Task store in a SQLite database (WAL mode), safe to share between processes and threads"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            prompt TEXT,
+            file_paths TEXT,
+            session_id TEXT,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_session ON tasks (session_id, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks (updated_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_expires ON tasks (expires_at);
+    """
+
+    def __init__(self, path: str = TASK_STORE_PATH, ttl: int = TASK_TTL_SECONDS):
+        self.ttl = ttl
+        self._last_eviction = 0.0
+        super().__init__(path)
+
+    def _row_to_task(self, row: sqlite3.Row) -> dict:
+        task = dict(row)
+        for field in JSON_FIELDS:
+            if task.get(field) is not None:
+                task[field] = json.loads(task[field])
+        task.pop("expires_at", None)
+        return task
+
+    def create(self, task_id: str, **fields):
+        _check_fields(fields)
+        now = time.time()
+        fields.setdefault("status", "pending")
+        fields.setdefault("progress", 0.0)
+        values = {key: json.dumps(value) if key in JSON_FIELDS else value for key, value in fields.items()}
+        values.update(task_id=task_id, created_at=now, updated_at=now, expires_at=now + self.ttl)
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        self._connect().execute(f"INSERT OR REPLACE INTO tasks ({columns}) VALUES ({placeholders})", list(values.values()))
+        self._notify(task_id)
+        self._maybe_evict()
+
+    def update(self, task_id: str, **fields):
+        _check_fields(fields)
+        now = time.time()
+        values = {key: json.dumps(value) if key in JSON_FIELDS else value for key, value in fields.items()}
+        values.update(updated_at=now, expires_at=now + self.ttl)
+        assignments = ", ".join(f"{key} = ?" for key in values)
+        self._connect().execute(f"UPDATE tasks SET {assignments} WHERE task_id = ?", list(values.values()) + [task_id])
+        self._notify(task_id)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT * FROM tasks WHERE task_id = ? AND expires_at > ?", (task_id, time.time())
+        ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def list(self, status: Optional[str] = None, session_id: Optional[str] = None, limit: int = 50) -> list:
+        """Task summaries (without results), most recently updated first"""
+        conditions = ["expires_at > ?"]
+        params = [time.time()]
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if session_id:
+            conditions.append("session_id = ?")
+            params.append(session_id)
+        rows = self._connect().execute(
+            f"SELECT {', '.join(SUMMARY_FIELDS)} FROM tasks WHERE {' AND '.join(conditions)} "
+            f"ORDER BY updated_at DESC LIMIT ?", params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete(self, task_id: str):
+        self._connect().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+        self._notify(task_id)
+
+    def evict_expired(self) -> int:
+        """Delete expired tasks, returns how many were deleted"""
+        self._last_eviction = time.time()
+        return self._connect().execute("DELETE FROM tasks WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def _maybe_evict(self):
+        if time.time() - self._last_eviction > EVICTION_INTERVAL:
+            self.evict_expired()
+
+class LocalRedis:
+    """In-process stand-in for the subset of Redis commands used by RedisTaskStore
+    Lets the Redis store run without a server (single process only, nothing is persisted).
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, key) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def hset(self, name, mapping: dict):
+        with self._lock:
+            if not self._alive(name):
+                self._data[name] = {}
+            self._data[name].update({key: str(value) for key, value in mapping.items()})
+
+    def hget(self, name, key):
+        with self._lock:
+            return self._data[name].get(key) if self._alive(name) else None
+
+    def hgetall(self, name) -> dict:
+        with self._lock:
+            return dict(self._data[name]) if self._alive(name) else {}
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if self._alive(name):
+                self._expires[name] = time.time() + seconds
+
+    def delete(self, *names):
+        with self._lock:
+            for name in names:
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+
+    def zadd(self, name, mapping: dict):
+        with self._lock:
+            if not self._alive(name):
+                self._data[name] = {}
+            self._data[name].update(mapping)
+
+    def zrem(self, name, *members):
+        with self._lock:
+            if self._alive(name):
+                for member in members:
+                    self._data[name].pop(member, None)
+
+    def zrevrangebyscore(self, name, max, min, start=None, num=None):
+        with self._lock:
+            if not self._alive(name):
+                return []
+            low = float("-inf") if min == "-inf" else float(min)
+            high = float("inf") if max == "+inf" else float(max)
+            members = sorted(((score, member) for member, score in self._data[name].items() if low <= score <= high), reverse=True)
+            members = [member for _, member in members]
+            if start is not None:
+                members = members[start:start + num]
+            return members
+
+    def zremrangebyscore(self, name, min, max):
+        with self._lock:
+            if not self._alive(name):
+                return 0
+            low = float("-inf") if min == "-inf" else float(min)
+            high = float("inf") if max == "+inf" else float(max)
+            removed = [member for member, score in self._data[name].items() if low <= score <= high]
+            for member in removed:
+                del self._data[name][member]
+            return len(removed)
+
+    def scan_iter(self, match=None):
+        with self._lock:
+            keys = [key for key in list(self._data) if self._alive(key)]
+        return [key for key in keys if match is None or fnmatch.fnmatchcase(key, match)]
+
+class RedisTaskStore(TaskListeners):
+    """Task store in Redis or any Redis-compatible server
+    Each task is a hash with a TTL; sorted sets scored by expiry time index all tasks, tasks by
+    status and tasks by session. Index entries of expired tasks are swept by evict_expired().
+    """
+
+    def __init__(self, client, ttl: int = TASK_TTL_SECONDS, prefix: str = "analyze:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._last_eviction = 0.0
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ":".join(parts)
+
+    def _index_keys(self, status: Optional[str] = None, session_id: Optional[str] = None) -> list:
+        keys = [self._key("tasks")]
+        if status:
+            keys.append(self._key("tasks", "status", status))
+        if session_id:
+            keys.append(self._key("tasks", "session", session_id))
+        return keys
+
+    def _write(self, task_id: str, fields: dict, previous_status: Optional[str] = None):
+        now = time.time()
+        values = {key: json.dumps(value) for key, value in fields.items()}
+        values["updated_at"] = json.dumps(now)
+        task_key = self._key("task", task_id)
+        self.client.hset(task_key, mapping=values)
+        self.client.expire(task_key, self.ttl)
+        status = fields.get("status")
+        if status and previous_status and previous_status != status:
+            self.client.zrem(self._key("tasks", "status", previous_status), task_id)
+        session_id = self._decode(self.client.hget(task_key, "session_id"))
+        current_status = status or self._decode(self.client.hget(task_key, "status"))
+        for key in self._index_keys(current_status, session_id):
+            self.client.zadd(key, {task_id: now + self.ttl})
+        self._notify(task_id)
+
+    def _decode(self, value):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        return json.loads(value)
+
+    def create(self, task_id: str, **fields):
+        _check_fields(fields)
+        fields.setdefault("status", "pending")
+        fields.setdefault("progress", 0.0)
+        fields["created_at"] = time.time()
+        self._write(task_id, fields)
+        if time.time() - self._last_eviction > EVICTION_INTERVAL:
+            self.evict_expired()
+
+    def update(self, task_id: str, **fields):
+        _check_fields(fields)
+        previous_status = None
+        if "status" in fields:
+            previous_status = self._decode(self.client.hget(self._key("task", task_id), "status"))
+        self._write(task_id, fields, previous_status)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        data = self.client.hgetall(self._key("task", task_id))
+        if not data:
+            return None
+        task = {(key.decode() if isinstance(key, bytes) else key): self._decode(value) for key, value in data.items()}
+        task["task_id"] = task_id
+        return task
+
+    def list(self, status: Optional[str] = None, session_id: Optional[str] = None, limit: int = 50) -> list:
+        """Task summaries (without results), most recently updated first"""
+        index_key = self._index_keys(status, session_id)[-1]
+        task_ids = self.client.zrevrangebyscore(index_key, "+inf", time.time(), start=0, num=limit * 2)
+        tasks = []
+        for task_id in task_ids:
+            task = self.get(task_id.decode() if isinstance(task_id, bytes) else task_id)
+            if task is None or (status and task.get("status") != status) or (session_id and task.get("session_id") != session_id):
+                continue
+            tasks.append({field: task.get(field) for field in SUMMARY_FIELDS})
+            if len(tasks) >= limit:
+                break
+        return tasks
+
+    def delete(self, task_id: str):
+        task = self.get(task_id)
+        self.client.delete(self._key("task", task_id))
+        if task:
+            for key in self._index_keys(task.get("status"), task.get("session_id")):
+                self.client.zrem(key, task_id)
+        self._notify(task_id)
+
+    def evict_expired(self) -> int:
+        """Remove index entries of expired tasks (the task hashes expire by themselves)"""
+        self._last_eviction = time.time()
+        removed = 0
+        for key in self.client.scan_iter(match=self._key("tasks") + "*"):
+            removed += self.client.zremrangebyscore(key, "-inf", time.time())
+        return removed
+
+def create_task_store(backend: str = TASK_STORE):
+    """Create the configured task store"""
+    backend = backend.lower()
+    if backend == "sqlite":
+        return SQLiteTaskStore()
+    if backend == "memory":
+        return RedisTaskStore(LocalRedis())
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("TASK_STORE=redis requires the 'redis' package (pip install redis)")
+        return RedisTaskStore(redis.Redis.from_url(TASK_STORE_URL))
+    raise ValueError(f"Unknown TASK_STORE: {backend}")
+
+_task_store = None
+_task_store_lock = threading.Lock()
+
+def get_task_store():
+    """Process-wide task store"""
+    global _task_store
+    with _task_store_lock:
+        if _task_store is None:
+            _task_store = create_task_store()
+        return _task_store
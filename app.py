@@ -1,21 +1,35 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
-from interpreter import interpreter
 from pathlib import Path
-import tempfile
-import shutil
-from typing import List, Optional
-import json
-import io
+from typing import Callable, List, Optional
 import traceback
-import sys
 import time
 import hashlib
+import inspect
 import threading
+import uuid
 from functools import wraps
 import plotly.express as px
 import plotly.graph_objects as go
+from api.data_cache import load_sheets, prefetch_sheets, CSV_SHEET_NAME
+from api.kernel import seed_interpreter_kernel, get_preloaded_instructions
+from api.interpreter_pool import get_interpreter_pool
+from api.sessions import get_session_manager, get_followup_context
+from api.context_builder import build_file_context
+from api.task_log import TaskLog, capture_output, get_task_log_path, read_task_log
+from api.metrics import StageTimer, timed_chat
+from api.cell_profiler import CellProfiler, slowest_cells
+from api.code_guard import CodeGuard
+from api.resource_limits import ResourceLimits, ResourceLimitExceeded, INTERRUPT_GRACE_SECONDS
+from api.analysis_executor import get_analysis_executor
+from api.output_catalog import get_output_catalog
+from api.frame_view import get_row_order
+from api.conversation_store import get_conversation_store
+from api.session_snapshot import save_snapshot, load_snapshot, is_valid_snapshot_id
+from api.data_profile import get_file_profile, schedule_profile, compute_sheet_profile
+from api.stub_backend import is_stub_backend_enabled
 
 # Check Streamlit version for st.dialog support
 try:
@@ -48,8 +62,18 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
+if 'conversation_id' not in st.session_state:
+    # Kept in the URL, so reloading the page brings back the stored history
+    query_params = getattr(st, "query_params", {})
+    conversation_id = query_params.get("conversation")
+    if not is_valid_snapshot_id(conversation_id):
+        # Missing or not a plain id (it names files on disk): start a new conversation
+        conversation_id = None
+    if conversation_id:
+        # Reconnect or server restart: files, sheets and loaded DataFrames come back from the session snapshot
+        st.session_state.update(load_snapshot(conversation_id) or {})
+    st.session_state.conversation_id = conversation_id or uuid.uuid4().hex
+    query_params["conversation"] = st.session_state.conversation_id
 if 'output_files' not in st.session_state:
     st.session_state.output_files = []
 if 'processed_dataframes' not in st.session_state:
@@ -62,24 +86,38 @@ if 'selected_folder_files' not in st.session_state:
     st.session_state.selected_folder_files = {}  # {folder_name: [file_paths]}
 if 'uploaded_file_paths' not in st.session_state:
     st.session_state.uploaded_file_paths = []  # List of uploaded file paths
+if 'analysis_session_id' not in st.session_state:
+    st.session_state.analysis_session_id = None  # Multi-turn session keeping interpreter state
+if 'analysis_jobs' not in st.session_state:
+    st.session_state.analysis_jobs = []  # Submitted analyses running on the background executor
 
 # Constants
 INPUT_FOLDERS = ["input_folder_1", "input_folder_2", "input_folder_3"]  # Predefined folder names
 OUTPUT_FOLDER = "output"
 UPLOAD_FOLDER = "uploads"
+JOB_REFRESH_SECONDS = 1  # Running analyses are re-rendered this often
+LIVE_OUTPUT_CHARS = 4000  # Characters of live output shown for a running analysis
+VIEWER_PAGE_SIZES = [100, 500, 1000]  # Rows per page in the generated files viewer
+HISTORY_PAGE_SIZE = 20  # Previous answers listed before "Show older answers"
+SNAPSHOT_KEYS = ["output_files", "selected_sheets", "selected_folder_files", "uploaded_file_paths"]  # Saved with the loaded DataFrames
 
 # Create necessary directories
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Start warming interpreters in the background (the pool is shared across sessions and reruns)
+get_interpreter_pool()
+
 # Load OpenAI API key
 def load_api_key():
     """Load API key from environment or .env file only"""
     from dotenv import load_dotenv
     load_dotenv()
     
-    # Only check environment variable
+    # Only check environment variable (the offline stub backend needs none)
     env_key = os.getenv("OPENAI_API_KEY")
+    if not env_key and is_stub_backend_enabled():
+        return "stub"
     return env_key
 
 # Load timeout from environment
@@ -118,8 +156,12 @@ def load_files_from_folder(folder_path: str) -> List[str]:
 def process_uploaded_file(uploaded_file) -> str:
     """Save uploaded file to upload folder and return path"""
     file_path = os.path.join(UPLOAD_FOLDER, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    data = uploaded_file.getbuffer()
+    # The uploader hands the same files back on every rerun; rewriting them would start a new file version
+    if not (os.path.exists(file_path) and os.path.getsize(file_path) == len(data) and Path(file_path).read_bytes() == data):
+        with open(file_path, "wb") as f:
+            f.write(data)
+    schedule_profile(file_path)
     return file_path
 
 def read_excel_or_csv(file_path: str):
@@ -133,49 +175,22 @@ def read_excel_or_csv(file_path: str):
         return pd.DataFrame()
     
     try:
+        # Parsed files are cached in memory and as columnar sidecars
+        sheets = load_sheets(file_path)
         if file_path.endswith('.csv'):
-            return pd.read_csv(file_path)
-        else:
-            # Read all sheets from Excel file
-            excel_file = pd.ExcelFile(file_path)
-            sheets_dict = {}
-            for sheet_name in excel_file.sheet_names:
-                sheets_dict[sheet_name] = pd.read_excel(excel_file, sheet_name=sheet_name)
-            return sheets_dict
+            return sheets[CSV_SHEET_NAME]
+        # Read all sheets from Excel file
+        return dict(sheets)
     except Exception as e:
         st.error(f"Error reading {file_path}: {str(e)}")
         return pd.DataFrame() if file_path.endswith('.csv') else {}
 
-def get_file_context(file_paths: List[str]) -> str:
-    """Create context string from file paths for the prompt"""
-    context = "Available files:\n"
-    for file_path in file_paths:
-        try:
-            # Skip text files in context (they're output files, not input files)
-            if file_path.endswith('.txt'):
-                context += f"\n- {os.path.basename(file_path)}: Text file\n"
-                continue
-            
-            data = read_excel_or_csv(file_path)
-            if isinstance(data, dict):
-                # Excel file with multiple sheets
-                context += f"\n- {os.path.basename(file_path)}: Excel file with {len(data)} sheet(s)\n"
-                for sheet_name, df in data.items():
-                    if not df.empty:
-                        context += f"  Sheet '{sheet_name}': {len(df)} rows, {len(df.columns)} columns\n"
-                        context += f"    Columns: {', '.join(df.columns.tolist())}\n"
-            elif isinstance(data, pd.DataFrame):
-                # CSV or single sheet
-                if not data.empty:
-                    context += f"\n- {os.path.basename(file_path)}: {len(data)} rows, {len(data.columns)} columns\n"
-                    context += f"  Columns: {', '.join(data.columns.tolist())}\n"
-                else:
-                    context += f"\n- {os.path.basename(file_path)}: Empty or unsupported file\n"
-            else:
-                context += f"\n- {os.path.basename(file_path)}: Empty or unsupported file\n"
-        except Exception as e:
-            context += f"\n- {os.path.basename(file_path)}: Error reading file - {str(e)}\n"
-    return context
+def get_file_context(file_paths: List[str], prompt: Optional[str] = None) -> str:
+    """Create context string from file paths for the prompt
+    Schemas, dtypes and tiny samples are fitted into CONTEXT_TOKEN_BUDGET tokens, prioritizing
+    sheets and columns that match the prompt. The result is cached per file version.
+    """
+    return build_file_context(file_paths, prompt)
 
 def get_current_dataframe(file_path: str):
     """Get the current dataframe for a file, handling multi-sheet Excel files"""
@@ -209,6 +224,25 @@ def get_sheet_names(file_path: str) -> list:
         return list(data.keys())
     return []
 
+def get_sheet_profile(file_path: str, df: pd.DataFrame) -> dict:
+    """Precomputed statistics of the sheet currently shown for a file (computed from df if there are none)"""
+    try:
+        sheets = get_file_profile(file_path)["sheets"]
+    except Exception:
+        return compute_sheet_profile(df)
+    if file_path.endswith('.csv'):
+        sheet_name = CSV_SHEET_NAME
+    else:
+        sheet_name = st.session_state.selected_sheets.get(file_path)
+        if sheet_name is None and sheets:
+            sheet_name = next(iter(sheets))
+    profile = sheets.get(str(sheet_name))
+    return profile if profile is not None else compute_sheet_profile(df)
+
+def profile_table(table: dict) -> pd.DataFrame:
+    """DataFrame from a table stored in a profile"""
+    return pd.DataFrame(table["data"], index=table["index"], columns=table["columns"])
+
 def show_file_preview_modal(file_path: str):
     """Show file preview in a modal with data, statistics, and visualizations"""
     # Check if file exists
@@ -272,6 +306,9 @@ def show_file_preview_modal(file_path: str):
         st.session_state.selected_sheets[file_path] = selected_sheet
         df = get_current_dataframe(file_path)
     
+    # Statistics are computed once per file version, not on every rerun
+    profile = get_sheet_profile(file_path, df)
+    
     st.markdown("---")
     
     # Create tabs for different views
@@ -286,19 +323,20 @@ def show_file_preview_modal(file_path: str):
     
     with tab2:
         st.markdown("**Statistical Summary:**")
-        if len(df.select_dtypes(include=['number']).columns) > 0:
-            st.dataframe(df.describe(), use_container_width=True)
+        if profile["describe"] is not None:
+            st.dataframe(profile_table(profile["describe"]), use_container_width=True)
         else:
             st.info("No numeric columns found for statistical summary.")
         
         st.markdown("**Missing Values:**")
-        missing_data = df.isnull().sum()
-        missing_df = pd.DataFrame({
-            'Column': missing_data.index,
-            'Missing Count': missing_data.values,
-            'Missing %': (missing_data.values / len(df) * 100).round(2)
-        })
-        missing_df = missing_df[missing_df['Missing Count'] > 0]
+        missing_df = pd.DataFrame([
+            {
+                'Column': info["column"],
+                'Missing Count': info["null"],
+                'Missing %': round(info["null"] / max(profile["rows"], 1) * 100, 2)
+            }
+            for info in profile["column_info"] if info["null"] > 0
+        ])
         if len(missing_df) > 0:
             st.dataframe(missing_df, use_container_width=True)
         else:
@@ -306,7 +344,9 @@ def show_file_preview_modal(file_path: str):
     
     with tab3:
         st.markdown("**Data Visualizations:**")
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        # Charts are drawn from the profile's bins and quantiles, so their size doesn't grow with the row count
+        numeric_cols = profile["numeric_columns"]
+        distributions = profile["distributions"]
         
         if len(numeric_cols) == 0:
             st.info("No numeric columns found for visualization.")
@@ -314,27 +354,67 @@ def show_file_preview_modal(file_path: str):
             # Distribution plots for numeric columns
             if len(numeric_cols) > 0:
                 selected_col = st.selectbox("Select column for distribution:", numeric_cols, key=f"dist_col_{file_path}")
-                if selected_col:
+                histogram = distributions[selected_col]["histogram"] if selected_col else None
+                if histogram:
                     try:
-                        fig = px.histogram(df, x=selected_col, title=f"Distribution of {selected_col}")
+                        edges = np.array(histogram["edges"])
+                        fig = go.Figure(go.Bar(
+                            x=(edges[:-1] + edges[1:]) / 2,
+                            y=histogram["counts"],
+                            width=np.diff(edges),
+                            name=selected_col
+                        ))
+                        fig.update_layout(title=f"Distribution of {selected_col}", xaxis_title=selected_col,
+                                          yaxis_title="count", bargap=0)
                         st.plotly_chart(fig, use_container_width=True)
                     except Exception as e:
                         st.warning(f"Could not create histogram: {str(e)}")
+                    
+                    try:
+                        series = distributions[selected_col]["rows"]
+                        fig = go.Figure(go.Scattergl(x=series["x"], y=series["y"], mode="lines", name=selected_col))
+                        fig.update_layout(title=f"{selected_col} by row", xaxis_title="Row", yaxis_title=selected_col)
+                        st.plotly_chart(fig, use_container_width=True)
+                        if series["total_points"] > len(series["x"]):
+                            st.caption(f"Downsampled to {len(series['x'])} of {series['total_points']} points (LTTB).")
+                    except Exception as e:
+                        st.warning(f"Could not create row chart: {str(e)}")
+                elif selected_col:
+                    st.info(f"No finite values in {selected_col}.")
             
             # Correlation heatmap if multiple numeric columns
-            if len(numeric_cols) > 1:
+            correlation = profile["correlation"]
+            if correlation is not None:
                 st.markdown("**Correlation Matrix:**")
+                # Wide sheets only have the strongest pairs stored
+                views = ["Strongest pairs"] if correlation["matrix"] is None else ["Full matrix", "Strongest pairs"]
+                view = st.radio("Show:", views, horizontal=True, key=f"corr_view_{file_path}")
+                if correlation["sampled_rows"]:
+                    st.caption(f"Computed from a random sample of {correlation['sampled_rows']} of {correlation['rows']} rows.")
                 try:
-                    corr_matrix = df[numeric_cols].corr()
-                    fig = px.imshow(
-                        corr_matrix,
-                        labels=dict(x="Columns", y="Columns", color="Correlation"),
-                        x=corr_matrix.columns,
-                        y=corr_matrix.columns,
-                        color_continuous_scale="RdBu",
-                        aspect="auto"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    if view == "Full matrix":
+                        corr_matrix = pd.DataFrame(correlation["matrix"], index=correlation["columns"],
+                                                   columns=correlation["columns"], dtype=float)
+                        fig = px.imshow(
+                            corr_matrix,
+                            labels=dict(x="Columns", y="Columns", color="Correlation"),
+                            x=corr_matrix.columns,
+                            y=corr_matrix.columns,
+                            color_continuous_scale="RdBu",
+                            zmin=-1,
+                            zmax=1,
+                            aspect="auto"
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                    elif correlation["top_pairs"]:
+                        pair_count = len(correlation["top_pairs"])
+                        top_k = st.slider("Number of pairs:", 1, pair_count, min(10, pair_count),
+                                          key=f"corr_top_k_{file_path}") if pair_count > 1 else 1
+                        pairs_df = pd.DataFrame(correlation["top_pairs"][:top_k]).rename(
+                            columns={"a": "Column A", "b": "Column B", "r": "Correlation"})
+                        st.dataframe(pairs_df, use_container_width=True)
+                    else:
+                        st.info("No column pairs have enough overlapping values.")
                 except Exception as e:
                     st.warning(f"Could not create correlation matrix: {str(e)}")
             
@@ -352,7 +432,18 @@ def show_file_preview_modal(file_path: str):
                         # Create box plots
                         fig = go.Figure()
                         for col in selected_cols:
-                            fig.add_trace(go.Box(y=df[col], name=col))
+                            box = distributions[col]["box"]
+                            if box is None:
+                                continue
+                            fig.add_trace(go.Box(
+                                x=[col], q1=[box["q1"]], median=[box["median"]], q3=[box["q3"]], mean=[box["mean"]],
+                                lowerfence=[box["lowerfence"]], upperfence=[box["upperfence"]], name=col
+                            ))
+                            if box["outliers"]:
+                                fig.add_trace(go.Scatter(
+                                    x=[col] * len(box["outliers"]), y=box["outliers"], mode="markers",
+                                    marker=dict(size=4), name=f"{col} outliers ({box['outlier_count']})", showlegend=False
+                                ))
                         fig.update_layout(title="Box Plots", yaxis_title="Value")
                         st.plotly_chart(fig, use_container_width=True)
                     except Exception as e:
@@ -360,28 +451,21 @@ def show_file_preview_modal(file_path: str):
     
     with tab4:
         st.markdown("**Data Types:**")
-        dtype_df = pd.DataFrame({
-            'Column': df.columns,
-            'Data Type': [str(dtype) for dtype in df.dtypes],
-            'Non-Null Count': df.count().values,
-            'Null Count': df.isnull().sum().values
-        })
+        dtype_df = pd.DataFrame([
+            {
+                'Column': info["column"],
+                'Data Type': info["dtype"],
+                'Non-Null Count': info["non_null"],
+                'Null Count': info["null"]
+            }
+            for info in profile["column_info"]
+        ])
         st.dataframe(dtype_df, use_container_width=True)
         
         st.markdown("**Memory Usage:**")
-        memory_usage = df.memory_usage(deep=True)
-        total_memory = memory_usage.sum() / 1024  # KB
+        total_memory = profile["memory_bytes"] / 1024  # KB
         st.info(f"Total memory usage: {total_memory:.2f} KB")
 
-def get_existing_output_files(output_folder: str) -> set:
-    """Get set of existing output files before execution"""
-    existing_files = set()
-    if os.path.exists(output_folder):
-        for file in os.listdir(output_folder):
-            if file.endswith(('.xlsx', '.xls', '.csv', '.txt')):
-                existing_files.add(os.path.join(output_folder, file))
-    return existing_files
-
 def save_answer_to_file(answer: str, prompt: str, output_folder: str) -> str:
     """Save the main answer to a text file"""
     timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -440,6 +524,44 @@ def extract_main_answer(response_text: str) -> str:
     
     return main_answer.strip()
 
+# Streamlit versions that accept a callable as download data only produce it when the button is clicked
+DEFERRED_DOWNLOADS = "callable" in (st.download_button.__doc__ or "")
+# Streamlit versions with stateful expanders (on_change) report whether an expander is open
+LAZY_EXPANDERS = "on_change" in inspect.signature(st.expander).parameters
+LAZY_TABS = "on_change" in inspect.signature(st.tabs).parameters
+
+def file_download_data(file_path: str):
+    """Download payload for a file: read on click where supported, so reruns don't read every output file"""
+    def read_file() -> bytes:
+        with open(file_path, "rb") as f:
+            return f.read()
+    return read_file if DEFERRED_DOWNLOADS else read_file()
+
+def show_slowest_cells(cells: list):
+    """Table of the slowest code cells of a run (wall time, CPU time, peak memory, rows, source)"""
+    if not cells:
+        return
+    st.markdown("**🐢 Slowest cells:**")
+    rows = []
+    for cell in slowest_cells(cells):
+        rows.append({
+            "Cell": cell["index"],
+            "Wall (s)": cell["wall_seconds"],
+            "CPU (s)": cell.get("cpu_seconds"),
+            "Peak memory (MB)": cell.get("peak_memory_mb"),
+            "Rows": cell.get("rows"),
+            "Source": cell["source"]
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def show_guard_hits(hits: list):
+    """Caption listing the slow pandas patterns the code guard rewrote or hinted about"""
+    if not hits:
+        return
+    st.caption("🛡️ Code guard: " + ", ".join(
+        f"{hit['rule']} {hit['action']} (cell {hit['cell']}, line {hit['line']})" for hit in hits
+    ))
+
 def timeout_handler(timeout_seconds: int):
     """Decorator to add timeout to a function call"""
     def decorator(func):
@@ -470,7 +592,8 @@ def timeout_handler(timeout_seconds: int):
         return wrapper
     return decorator
 
-def call_openai_code_interpreter(prompt: str, file_paths: List[str], output_folder: str, timeout_seconds: int = 300) -> tuple:
+def call_openai_code_interpreter(prompt: str, file_paths: List[str], output_folder: str, timeout_seconds: int = 300, session=None,
+                                 task_id: Optional[str] = None, on_progress: Optional[Callable[[float, str], None]] = None) -> tuple:
     """
     Call Open Interpreter to analyze files and execute code
     Args:
@@ -478,15 +601,29 @@ def call_openai_code_interpreter(prompt: str, file_paths: List[str], output_fold
         file_paths: List of file paths to analyze
         output_folder: Folder to save output files
         timeout_seconds: Maximum time to wait for execution (default: 300 seconds = 5 minutes)
-    Returns: (main_answer, intermediate_steps, generated_files, answer_file_path)
+        session: Optional AnalysisSession whose interpreter and kernel state are reused across prompts
+        task_id: Id of the output log (a random one if not given), so callers can follow the output live
+        on_progress: Called with (progress from 0 to 1, stage description) as the analysis advances
+    Returns: (main_answer, intermediate_steps, generated_files, answer_file_path, log_file, run_stats)
+    intermediate_steps is the tail of the output; log_file is the full output log if the tail was truncated;
+    run_stats has the seconds spent in each stage ("timings"), the profiled code cells ("cells"), the
+    code guard's rule hits ("guard") and the CPU time and peak memory of the generated code ("resources").
     """
     api_key = load_api_key()
     if not api_key:
         error_msg = "Error: OpenAI API key not found. Please set OPENAI_API_KEY in your environment/.env file."
-        return error_msg, "", [], None
+        return error_msg, "", [], None, None, {"timings": {}, "cells": [], "guard": [], "resources": {}}
+    
+    timer = StageTimer("streamlit")
+    
+    def report_progress(progress: float, stage: str):
+        if on_progress is not None:
+            on_progress(progress, stage)
     
     # Get existing files before execution
-    existing_files = get_existing_output_files(output_folder)
+    # Files added to the output catalog after this point are this analysis' outputs
+    with timer.stage("output_scan"):
+        output_mark = get_output_catalog(output_folder).refresh()
     
     # Generate unique summary filename for this request
     timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -494,6 +631,16 @@ def call_openai_code_interpreter(prompt: str, file_paths: List[str], output_fold
     summary_filename = f"summary_{timestamp}_{prompt_hash}.txt"
     summary_filepath = os.path.join(output_folder, summary_filename)
     
+    # Take a warm interpreter (clean kernel with pandas/numpy imported) from the pool,
+    # or keep using the session's interpreter
+    is_followup = session is not None and session.turns > 0
+    report_progress(0.1, "Waiting for an interpreter")
+    with timer.stage("acquire_interpreter"):
+        interpreter = session.interpreter if session is not None else get_interpreter_pool().acquire()
+    interpreter_healthy = False
+    profiler = CellProfiler(interpreter)
+    report_progress(0.2, "Loading files")
+    
     # Configure Open Interpreter
     interpreter.api_key = api_key
     interpreter.auto_run = True  # Automatically execute code
@@ -502,9 +649,24 @@ def call_openai_code_interpreter(prompt: str, file_paths: List[str], output_fold
     if hasattr(interpreter, 'max_executions'):
         interpreter.max_executions = 50  # Limit number of code executions to prevent infinite loops
     
+    # Pre-load the parsed files into the interpreter's Python kernel (a session already has them)
+    preloaded_instructions = ""
+    if not is_followup:
+        with timer.stage("seed_kernel"):
+            preloaded_instructions = get_preloaded_instructions(seed_interpreter_kernel(interpreter, file_paths))
+    # Slow pandas patterns in generated cells are rewritten or answered with a hint
+    guard = CodeGuard(interpreter, file_paths if preloaded_instructions or is_followup else None)
+    # CPU time, memory and wall-clock limits for the generated code
+    limits = ResourceLimits(interpreter, wall_seconds=timeout_seconds)
+    
+    def collect_run_stats():
+        return {"timings": timer.finish(), "cells": profiler.cells, "guard": guard.hits, "resources": limits.usage()}
+    
     # Create context about available files
-    file_context = get_file_context(file_paths)
+    with timer.stage("file_context"):
+        file_context = get_file_context(file_paths, prompt)
     file_paths_str = "\n".join([f"  - {fp}" for fp in file_paths])
+    report_progress(0.3, "Preparing the prompt")
     
     # Build the system context message
     system_context = f"""You are an expert data analyst working with Excel and CSV files.
@@ -514,13 +676,14 @@ Available files:
 
 File paths (use these exact paths in your code):
 {file_paths_str}
+{preloaded_instructions}
 
 Output folder: {output_folder}
 
 IMPORTANT INSTRUCTIONS:
 1. When reading files, use the exact file paths provided above
 2. When saving results, save to: {output_folder}
-3. Use pandas (pd.read_excel, pd.read_csv) to read files
+3. Use the pre-loaded `sheets` DataFrames when available, otherwise use pandas (pd.read_excel, pd.read_csv) to read files
 4. Use df.to_excel() or df.to_csv() to save results
 5. Always use index=False when saving Excel files
 6. Provide clear explanations of what you're doing
@@ -544,48 +707,45 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
    - Important conclusions
    - Any significant trends or changes identified
 11. DO NOT skip creating this summary file - it is required!"""
+    if is_followup:
+        # Follow-up turn: the kernel still holds the data and earlier results
+        system_context = get_followup_context(output_folder, summary_filepath)
     
     try:
         # Create the full prompt with context
         full_prompt = f"{system_context}\n\nUser request: {prompt}"
         
-        # Capture stdout to get Open Interpreter's output
-        output_buffer = io.StringIO()
-        old_stdout = sys.stdout
+        # Capture stdout to get Open Interpreter's output, spooled to a log file (only the tail is kept in memory)
+        output_log = TaskLog(task_id or hashlib.md5(f"{prompt}{time.time()}".encode()).hexdigest()[:12])
         
         # Define the interpreter chat function with timeout
-        @timeout_handler(timeout_seconds)
+        # Backstop only: the wall-clock limit above stops the chat first, including the time an
+        # interrupted kernel gets before it is killed
+        @timeout_handler(timeout_seconds + INTERRUPT_GRACE_SECONDS * 2)
         def run_interpreter():
-            sys.stdout = output_buffer
-            try:
-                # Reset interpreter to ensure clean state before each run
-                if hasattr(interpreter, 'reset'):
-                    interpreter.reset()
-                
-                # Run the interpreter chat - it should return after completing
-                # Some versions of open-interpreter may return a value, others don't
-                result = interpreter.chat(full_prompt)
-                return result
-            except Exception as e:
-                # Log any exceptions but don't let them stop execution
-                print(f"Interpreter error: {str(e)}", file=output_buffer)
-                raise
-            finally:
-                sys.stdout = old_stdout
+            # Only this thread's output is captured (other analyses may be running at the same time)
+            with capture_output(output_log):
+                try:
+                    # Run the interpreter chat - it should return after completing
+                    # Some versions of open-interpreter may return a value, others don't
+                    with timed_chat(interpreter, timer), limits.attach(), profiler.attach(), guard.attach():
+                        result = interpreter.chat(full_prompt)
+                    return result
+                except Exception as e:
+                    # Log any exceptions but don't let them stop execution
+                    print(f"Interpreter error: {str(e)}", file=output_log)
+                    raise
         
         try:
             # Run interpreter with timeout
+            report_progress(0.5, "Running analysis")
             run_interpreter()
+            interpreter_healthy = True
+            report_progress(0.8, "Collecting results")
             # Get the captured output after execution
-            response_text = output_buffer.getvalue()
-            
-            # Ensure stdout is properly restored
-            if sys.stdout != old_stdout:
-                sys.stdout = old_stdout
+            response_text = output_log.tail()
             
         except TimeoutError as e:
-            # Restore stdout
-            sys.stdout = old_stdout
             error_msg = f"⏱️ Timeout Error: {str(e)}\n\n" + \
                        f"The operation exceeded the time limit of {timeout_seconds} seconds.\n\n" + \
                        "Possible solutions:\n" + \
@@ -593,23 +753,31 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
                        "2. Reduce the size of input files\n" + \
                        "3. Increase the TIMEOUT_SECONDS in your environment/.env file\n" + \
                        "4. Check if the files are too large or complex"
-            return error_msg, error_msg, [], None
+            return error_msg, error_msg, [], None, None, collect_run_stats()
+        except ResourceLimitExceeded as e:
+            error_msg = f"🛑 Resource Limit: {str(e)}\n\n" + \
+                       "The generated code was stopped. Try a simpler request, smaller files, or raise " + \
+                       "TASK_CPU_SECONDS / TASK_MEMORY_MB in your environment/.env file."
+            return error_msg, error_msg, [], None, None, collect_run_stats()
         except Exception as e:
-            # Restore stdout
-            sys.stdout = old_stdout
             error_msg = f"Error during execution: {str(e)}\n{traceback.format_exc()}"
-            return error_msg, error_msg, [], None
+            return error_msg, error_msg, [], None, None, collect_run_stats()
         finally:
-            # Ensure stdout is restored
-            if sys.stdout != old_stdout:
-                sys.stdout = old_stdout
+            output_log.close()
+            # Return the interpreter to the pool (timed out or failed ones are replaced)
+            if session is not None:
+                session.touch()
+                if interpreter_healthy:
+                    session.turns += 1
+                else:
+                    get_session_manager().close(session.session_id, healthy=False)
+            else:
+                get_interpreter_pool().release(interpreter, healthy=interpreter_healthy)
         
         # Check for newly generated files
-        generated_files = []
-        current_files = get_existing_output_files(output_folder)
-        for file_path in current_files:
-            if file_path not in existing_files:
-                generated_files.append(file_path)
+        with timer.stage("output_scan"):
+            generated_files = get_output_catalog(output_folder).added_since(output_mark)
+            get_output_catalog(output_folder).assign(generated_files, output_log.task_id, prompt_hash)
         
         # Try to read the summary file as the main answer
         main_answer = ""
@@ -677,11 +845,407 @@ CRITICAL: You MUST create a summary file at the end of your analysis!
         else:
             answer_file_path = save_answer_to_file(main_answer, prompt, output_folder)
         
-        return main_answer, intermediate_steps, generated_files, answer_file_path
+        log_file = output_log.path if output_log.truncated else None
+        return main_answer, intermediate_steps, generated_files, answer_file_path, log_file, collect_run_stats()
         
     except Exception as e:
         error_msg = f"Error using Open Interpreter: {str(e)}\n{traceback.format_exc()}"
-        return error_msg, error_msg, [], None
+        return error_msg, error_msg, [], None, None, collect_run_stats()
+
+def submit_analysis_job(prompt: str, file_paths: List[str], timeout_seconds: int, session=None) -> dict:
+    """Queue an analysis on the background executor and return its job
+    The worker keeps job["progress"] and job["stage"] up to date; the output is spooled to the log of job["id"].
+    """
+    job = {
+        "id": uuid.uuid4().hex[:12],
+        "prompt": prompt,
+        "file_paths": list(file_paths),
+        "session": session,
+        "progress": 0.0,
+        "stage": "Queued",
+        "submitted": time.time()
+    }
+    
+    def on_progress(progress: float, stage: str):
+        job["progress"] = progress
+        job["stage"] = stage
+    
+    def run_job():
+        if session is None:
+            return call_openai_code_interpreter(prompt, file_paths, OUTPUT_FOLDER, timeout_seconds=timeout_seconds,
+                                                task_id=job["id"], on_progress=on_progress)
+        # Turns of a follow-up session run one after another
+        on_progress(0.0, "Waiting for the previous follow-up prompt")
+        with session.lock:
+            if session.closed:
+                # Closed by the idle reaper while the job was queued; its interpreter is back in the pool
+                raise RuntimeError("The analysis session expired before this prompt ran. Send it again to start a new session.")
+            return call_openai_code_interpreter(prompt, file_paths, OUTPUT_FOLDER, timeout_seconds=timeout_seconds,
+                                                session=session, task_id=job["id"], on_progress=on_progress)
+    
+    if session is not None:
+        # Counts as activity, so the idle reaper doesn't close the session while the job is queued
+        session.touch()
+    job["future"] = get_analysis_executor().submit(run_job)
+    return job
+
+def finish_analysis_job(job: dict):
+    """Add a finished analysis to the conversation and load its generated files"""
+    try:
+        main_answer, intermediate_steps, generated_files, answer_file_path, log_file, run_stats = job["future"].result()
+    except Exception as e:
+        error_msg = f"Error during processing: {str(e)}\n{traceback.format_exc()}"
+        main_answer, intermediate_steps, generated_files, answer_file_path, log_file, run_stats = error_msg, error_msg, [], None, None, {}
+    
+    session = job["session"]
+    if session is not None and session.closed and st.session_state.analysis_session_id == session.session_id:
+        # The session was dropped after a failed or timed-out turn
+        st.session_state.analysis_session_id = None
+    
+    # Store response in the conversation history
+    message_id = get_conversation_store().add(st.session_state.conversation_id, {
+        "prompt": job["prompt"],
+        "main_answer": main_answer,
+        "intermediate_steps": intermediate_steps,
+        "log_file": log_file,
+        "timings": run_stats.get("timings", {}),
+        "cells": run_stats.get("cells", []),
+        "guard": run_stats.get("guard", []),
+        "resources": run_stats.get("resources", {}),
+        "files": generated_files,
+        "answer_file": answer_file_path
+    })
+    
+    # Update output files (include answer file)
+    all_output_files = generated_files.copy()
+    if answer_file_path:
+        all_output_files.append(answer_file_path)
+    st.session_state.output_files = all_output_files
+    
+    # Generated Excel/CSV files are parsed in the background and only loaded into the session when their tab is opened
+    for file_path in generated_files:
+        if not file_path.endswith('.txt'):
+            prefetch_sheets(file_path)
+    
+    # Mark that we should show summary tab if summary exists
+    if answer_file_path and os.path.basename(answer_file_path).startswith('summary_'):
+        st.session_state.active_tab_index[message_id] = 0  # Summary tab
+
+def close_analysis_session(session_id: str):
+    """End a follow-up session; one with a queued or running prompt is left to the idle reaper"""
+    session = get_session_manager().get(session_id)
+    if session is None:
+        return
+    busy = session.lock.locked() or any(
+        job["session"] is session and not job["future"].done() for job in st.session_state.analysis_jobs
+    )
+    if not busy:
+        get_session_manager().close(session_id)
+
+def read_live_output(task_id: str, chars: int = LIVE_OUTPUT_CHARS) -> str:
+    """End of a running analysis' output log"""
+    path = get_task_log_path(task_id)
+    if not os.path.exists(path):
+        return ""
+    # Up to 4 bytes per character
+    page = read_task_log(task_id, offset=max(0, os.path.getsize(path) - chars * 4))
+    return page["content"][-chars:] if page else ""
+
+def show_analysis_jobs():
+    """Progress and live output of the running analyses; finished ones are moved into the conversation"""
+    jobs = st.session_state.analysis_jobs
+    finished = [job for job in jobs if job["future"].done()]
+    if finished:
+        for job in finished:
+            jobs.remove(job)
+            finish_analysis_job(job)
+        st.rerun()
+    
+    st.subheader(f"⏳ Running analyses ({len(jobs)})")
+    for job in jobs:
+        with st.container(border=True):
+            st.markdown(f"**{job['prompt'][:200]}**")
+            st.progress(job["progress"], text=f"{job['stage']} ({time.time() - job['submitted']:.0f}s)")
+            live_output = read_live_output(job["id"])
+            if live_output:
+                st.code(live_output, language=None)
+    if _fragment is None:
+        st.button("🔄 Refresh progress")
+
+def show_dataframe_viewer(file_path: str, key_suffix):
+    """Sheet picker and paginated table of a generated file
+    Only the visible page is sent to the browser; sorting and filtering run on the cached DataFrame.
+    """
+    sheet_names = get_sheet_names(file_path)
+    if sheet_names and len(sheet_names) > 1:
+        current_sheet = st.session_state.selected_sheets.get(file_path)
+        st.session_state.selected_sheets[file_path] = st.radio(
+            "Select Sheet:",
+            sheet_names,
+            index=sheet_names.index(current_sheet) if current_sheet in sheet_names else 0,
+            horizontal=True,
+            key=f"sheet_radio_{file_path}_{key_suffix}"
+        )
+    
+    df = get_current_dataframe(file_path)
+    if df is None or df.empty:
+        return
+    
+    # File info
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Rows", len(df))
+    with col2:
+        st.metric("Columns", len(df.columns))
+    with col3:
+        st.metric("File Size", f"{os.path.getsize(file_path) / 1024:.2f} KB")
+    
+    # Server-side filter and sort
+    columns = list(df.columns)
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    with col1:
+        query = st.text_input("Filter", key=f"view_query_{file_path}_{key_suffix}", placeholder="Text to search for")
+    with col2:
+        filter_column = st.selectbox("In column", [None] + columns, format_func=lambda c: "All columns" if c is None else str(c),
+                                     key=f"view_filter_column_{file_path}_{key_suffix}")
+    with col3:
+        sort_by = st.selectbox("Sort by", [None] + columns, format_func=lambda c: "—" if c is None else str(c),
+                               key=f"view_sort_{file_path}_{key_suffix}")
+    with col4:
+        descending = st.checkbox("Descending", key=f"view_desc_{file_path}_{key_suffix}")
+    
+    sheet = st.session_state.selected_sheets.get(file_path)
+    frame_key = (file_path, sheet, os.path.getmtime(file_path), id(df))
+    page_size = st.session_state.get(f"view_page_size_{file_path}_{key_suffix}", VIEWER_PAGE_SIZES[0])
+    positions = get_row_order(df, frame_key, sort_by, not descending, query.strip(), filter_column)
+    total_rows = len(positions)
+    page_count = max(1, -(-total_rows // page_size))
+    page_key = f"view_page_{file_path}_{key_suffix}"
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+    with col2:
+        st.selectbox("Rows per page", VIEWER_PAGE_SIZES, key=f"view_page_size_{file_path}_{key_suffix}")
+    first_row = (int(page) - 1) * page_size
+    page_df = df.iloc[positions[first_row:first_row + page_size]]
+    with col3:
+        st.caption(f"Rows {first_row + 1 if total_rows else 0}–{first_row + len(page_df)} of {total_rows}"
+                   + (f" (filtered from {len(df)})" if total_rows != len(df) else ""))
+    
+    # DataFrame display
+    st.dataframe(page_df, use_container_width=True)
+
+def lazy_tabs(labels: list, key: str):
+    """Tabs that report which one is selected, so hidden tabs can skip their content (Streamlit with stateful tabs)"""
+    if LAZY_TABS:
+        return st.tabs(labels, key=key, on_change="rerun")
+    return st.tabs(labels)
+
+def tab_is_open(tab) -> bool:
+    """Whether a tab's content should be rendered (always, if tabs don't track their state)"""
+    return getattr(tab, "open", None) is not False
+
+def load_generated_file(file_path: str):
+    """Load a generated file into the session (waits for its background parse if one is running)"""
+    with st.spinner(f"Loading {os.path.basename(file_path)}..."):
+        data = read_excel_or_csv(file_path)
+    if isinstance(data, dict) and data:
+        # Excel file with multiple sheets
+        st.session_state.processed_dataframes[file_path] = data
+        # Set default selected sheet to first sheet
+        if file_path not in st.session_state.selected_sheets:
+            st.session_state.selected_sheets[file_path] = list(data.keys())[0]
+    elif isinstance(data, pd.DataFrame) and not data.empty:
+        # CSV or single sheet Excel
+        st.session_state.processed_dataframes[file_path] = data
+
+def show_message(msg: dict, key: str):
+    """Prompt, answer, intermediate steps and generated files of a stored answer"""
+    # Get message data (handle both old and new format)
+    prompt_text = msg.get('prompt', '')
+    main_answer = msg.get('main_answer', msg.get('response', ''))
+    intermediate_steps = msg.get('intermediate_steps', '')
+    log_file = msg.get('log_file')
+    timings = msg.get('timings') or {}
+    cells = msg.get('cells') or []
+    guard_hits = msg.get('guard') or []
+    resources = msg.get('resources') or {}
+    generated_files = msg.get('files', [])
+    answer_file = msg.get('answer_file', None)
+    
+    # Combine all output files (generated files + answer file)
+    all_output_files = generated_files.copy()
+    if answer_file and answer_file not in all_output_files:
+        all_output_files.append(answer_file)
+    
+    # Check if summary file exists and should be shown first
+    has_summary = answer_file and os.path.basename(answer_file).startswith('summary_')
+    
+    st.markdown(f"**Prompt:** {prompt_text}")
+    st.markdown("---")
+    
+    # Create tabs - put Summary first if available, otherwise Main Answer
+    if has_summary:
+        tab1, tab2, tab3 = lazy_tabs(["📋 Summary", "🔍 Intermediate Steps", "📊 Generated Files"], f"answer_tabs_{key}")
+    else:
+        tab1, tab2, tab3 = lazy_tabs(["✨ Main Answer", "🔍 Intermediate Steps", "📊 Generated Files"], f"answer_tabs_{key}")
+    
+    with tab1:
+        # Display main answer
+        st.markdown(main_answer)
+        
+        # Show answer file info and download
+        if answer_file and os.path.exists(answer_file):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.success(f"✅ Answer saved to: `{os.path.basename(answer_file)}`")
+            with col2:
+                st.download_button(
+                    label="📥 Download Answer",
+                    data=file_download_data(answer_file),
+                    file_name=os.path.basename(answer_file),
+                    mime="text/plain",
+                    key=f"download_answer_{key}"
+                )
+    
+    with tab2:
+        # Display intermediate steps in scrolled window
+        if intermediate_steps and intermediate_steps != main_answer:
+            st.markdown("**Execution Details:**")
+            st.text_area(
+                "Intermediate steps and execution logs",
+                value=intermediate_steps,
+                height=500,
+                key=f"intermediate_{key}",
+                label_visibility="collapsed",
+                disabled=True  # Make it read-only and scrollable
+            )
+            if log_file and os.path.exists(log_file):
+                st.caption(f"Showing the end of the output. Full log ({os.path.getsize(log_file) / 1024:.1f} KB): `{log_file}`")
+            if timings:
+                st.caption("⏱️ " + ", ".join(f"{stage}: {seconds:.2f}s" for stage, seconds in timings.items()))
+            if resources:
+                st.caption(f"🧮 Generated code used {resources['cpu_seconds']:.1f} s CPU, peak memory {resources['peak_rss_mb']:.0f} MB")
+            show_slowest_cells(cells)
+            show_guard_hits(guard_hits)
+        else:
+            st.info("No intermediate steps available.")
+    
+    with tab3:
+        # Generated Files tab with file viewer (files are only read once their tab is opened)
+        if not tab_is_open(tab3):
+            return
+        if all_output_files:
+            # Create file name tabs at the top
+            file_tabs = lazy_tabs([os.path.basename(f) for f in all_output_files], f"file_tabs_{key}")
+            
+            for tab_idx, file_path in enumerate(all_output_files):
+                with file_tabs[tab_idx]:
+                    if not tab_is_open(file_tabs[tab_idx]):
+                        continue
+                    if os.path.exists(file_path):
+                        if not file_path.endswith('.txt') and file_path not in st.session_state.processed_dataframes:
+                            load_generated_file(file_path)
+                        
+                        # Check if it's a text file (answer file)
+                        if file_path.endswith('.txt'):
+                            # Display text file content
+                            with open(file_path, "r", encoding="utf-8") as f:
+                                file_content = f.read()
+                            
+                            st.markdown("**File Content:**")
+                            st.text_area(
+                                "File content",
+                                value=file_content,
+                                height=400,
+                                key=f"text_viewer_{file_path}_{key}",
+                                label_visibility="collapsed"
+                            )
+                            
+                            # Download button for text file
+                            st.download_button(
+                                label="📥 Download Text File",
+                                data=file_download_data(file_path),
+                                file_name=os.path.basename(file_path),
+                                mime="text/plain",
+                                key=f"download_text_{file_path}_{key}"
+                            )
+                        
+                        # Check if it's a dataframe file
+                        elif file_path in st.session_state.processed_dataframes:
+                            # Paginated viewer; paging, sorting and switching sheets only re-run the viewer
+                            show_dataframe_viewer(file_path, key)
+                            
+                            df = get_current_dataframe(file_path)
+                            if df is not None and not df.empty:
+                                # Download button
+                                if file_path.endswith('.csv'):
+                                    st.download_button(
+                                        label="📥 Download CSV",
+                                        data=file_download_data(file_path),
+                                        file_name=os.path.basename(file_path),
+                                        mime="text/csv",
+                                        key=f"download_csv_{file_path}_{key}"
+                                    )
+                                else:
+                                    # For Excel, we'll use the existing file (read only when downloaded)
+                                    st.download_button(
+                                        label="📥 Download Excel",
+                                        data=file_download_data(file_path),
+                                        file_name=os.path.basename(file_path),
+                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                        key=f"download_excel_{file_path}_{key}"
+                                    )
+                            else:
+                                st.warning("No data available to display.")
+                        else:
+                            st.warning("File type not supported for preview. You can still download it.")
+                            st.download_button(
+                                label="📥 Download File",
+                                data=file_download_data(file_path),
+                                file_name=os.path.basename(file_path),
+                                mime="application/octet-stream",
+                                key=f"download_file_{file_path}_{key}"
+                            )
+                    else:
+                        st.warning(f"File not found: {os.path.basename(file_path)}")
+        else:
+            st.info("No generated files available.")
+
+def show_previous_message(summary: dict):
+    """Collapsed older answer; its content is only loaded from the history store while it is open"""
+    prompt_text = summary.get('prompt') or ''
+    # Truncate prompt for display if too long
+    display_prompt = prompt_text[:60] + "..." if len(prompt_text) > 60 else prompt_text
+    asked_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(summary["created_at"]))
+    label = f"📜 Previous Answer ({asked_at}): {display_prompt}"
+    key = summary["message_id"][:12]
+    if LAZY_EXPANDERS:
+        expander = st.expander(label, expanded=False, key=f"history_{key}", on_change="rerun")
+        with expander:
+            if expander.open:
+                show_stored_message(summary["message_id"], key)
+    else:
+        with st.expander(label, expanded=False):
+            if st.toggle("Show answer", key=f"history_{key}"):
+                show_stored_message(summary["message_id"], key)
+
+def show_stored_message(message_id: str, key: str):
+    msg = get_conversation_store().get(message_id)
+    if msg is None:
+        st.warning("This answer is no longer in the history.")
+        return
+    show_message(msg, key)
+
+# st.fragment (Streamlit >= 1.37) re-runs only part of the page: the running analyses on a timer,
+# and a file viewer when it is paged, sorted or switched to another sheet
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+if _fragment is not None:
+    show_analysis_jobs = _fragment(run_every=JOB_REFRESH_SECONDS)(show_analysis_jobs)
+    show_dataframe_viewer = _fragment(show_dataframe_viewer)
 
 # Main UI
 st.title("📊 Analyze & Excel")
@@ -745,6 +1309,8 @@ with st.sidebar:
                             folder_files = load_files_from_folder(folder)
                             if folder_files:
                                 st.session_state.selected_folder_files[folder] = folder_files
+                                for file_path in folder_files:
+                                    schedule_profile(file_path)
                                 st.success(f"✅ {len(folder_files)} file(s) from {folder} added to selections")
                                 st.rerun()
                             else:
@@ -872,6 +1438,29 @@ prompt = st.text_area(
     placeholder="Example: Analyze the sales data and create a summary report with monthly totals..."
 )
 
+# Multi-turn session: follow-up prompts reuse the interpreter and everything computed before
+analysis_session = None
+if st.session_state.analysis_session_id:
+    analysis_session = get_session_manager().get(st.session_state.analysis_session_id)
+    if analysis_session is None:
+        # Session expired after the idle timeout
+        st.session_state.analysis_session_id = None
+
+keep_session = st.checkbox(
+    "🔗 Follow-up mode (keep results in memory between prompts)",
+    value=analysis_session is not None,
+    key="keep_session"
+)
+if analysis_session is not None:
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.caption(f"Session active: {analysis_session.turns} prompt(s) answered. Follow-up prompts reuse previous results.")
+    with col2:
+        if st.button("End Session", use_container_width=True):
+            close_analysis_session(analysis_session.session_id)
+            st.session_state.analysis_session_id = None
+            st.rerun()
+
 # Submit button
 col1, col2, col3 = st.columns([1, 1, 4])
 with col1:
@@ -897,12 +1486,16 @@ if st.session_state.show_clear_modal:
         col1, col2 = st.columns(2)
         with col1:
             if st.button("✅ Yes, Clear", type="primary", use_container_width=True):
-                st.session_state.messages = []
+                get_conversation_store().clear(st.session_state.conversation_id)
+                st.session_state.history_limit = HISTORY_PAGE_SIZE
                 st.session_state.output_files = []
                 st.session_state.processed_dataframes = {}
                 st.session_state.selected_sheets = {}
                 st.session_state.selected_folder_files = {}
                 st.session_state.uploaded_file_paths = []
+                if st.session_state.analysis_session_id:
+                    close_analysis_session(st.session_state.analysis_session_id)
+                    st.session_state.analysis_session_id = None
                 st.session_state.show_clear_modal = False
                 st.rerun()
         with col2:
@@ -910,481 +1503,63 @@ if st.session_state.show_clear_modal:
                 st.session_state.show_clear_modal = False
                 st.rerun()
 
-# Process submission
+# Process submission: the analysis is queued on the background executor, so the page stays interactive
+# and several analyses can run at once; show_analysis_jobs() follows their progress
 if submit_button:
     if not all_selected_files:
         st.error("Please select files or upload files first!")
     elif not prompt.strip():
         st.error("Please enter a prompt!")
     else:
-        # Show loading spinner while processing
-        status_container = st.empty()
-        with status_container.container():
-            st.info("🔄 Processing your request with Open Interpreter... Please wait.")
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+        # Get timeout from environment or use default (5 minutes)
+        timeout_seconds = load_timeout()
         
-        try:
-            # Get timeout from environment or use default (5 minutes)
-            timeout_seconds = load_timeout()
-            
-            # Call Open Interpreter with timeout
-            main_answer, intermediate_steps, generated_files, answer_file_path = call_openai_code_interpreter(
-                prompt, 
-                all_selected_files, 
-                OUTPUT_FOLDER,
-                timeout_seconds=timeout_seconds
-            )
-            
-            # Clear loading indicators
-            status_container.empty()
-            progress_bar.empty()
-            status_text.empty()
-            
-            # Store response
-            st.session_state.messages.append({
-                "prompt": prompt,
-                "main_answer": main_answer,
-                "intermediate_steps": intermediate_steps,
-                "files": generated_files,
-                "answer_file": answer_file_path
-            })
-            
-            # Update output files (include answer file)
-            all_output_files = generated_files.copy()
-            if answer_file_path:
-                all_output_files.append(answer_file_path)
-            st.session_state.output_files = all_output_files
-            
-            # Load generated dataframes (skip text files)
-            for file_path in generated_files:
-                if file_path not in st.session_state.processed_dataframes:
-                    # Only load Excel/CSV files, not text files
-                    if not file_path.endswith('.txt'):
-                        data = read_excel_or_csv(file_path)
-                        if isinstance(data, dict):
-                            # Excel file with multiple sheets
-                            st.session_state.processed_dataframes[file_path] = data
-                            # Set default selected sheet to first sheet
-                            if file_path not in st.session_state.selected_sheets:
-                                st.session_state.selected_sheets[file_path] = list(data.keys())[0] if data else None
-                        elif isinstance(data, pd.DataFrame) and not data.empty:
-                            # CSV or single sheet Excel
-                            st.session_state.processed_dataframes[file_path] = data
-            
-            # Mark that we should show summary tab if summary exists
-            if answer_file_path and os.path.basename(answer_file_path).startswith('summary_'):
-                st.session_state.active_tab_index[len(st.session_state.messages) - 1] = 0  # Summary tab
-            
-            # Success message - the results will be displayed below automatically
-            if generated_files:
-                st.success(f"✅ Successfully generated {len(generated_files)} file(s)!")
-        except TimeoutError as e:
-            status_container.empty()
-            progress_bar.empty()
-            status_text.empty()
-            st.error(f"⏱️ Timeout Error: {str(e)}")
-            st.warning("💡 Tip: Try simplifying your request, reducing file sizes, or increasing the TIMEOUT_SECONDS in your environment/.env file.")
-        except Exception as e:
-            status_container.empty()
-            progress_bar.empty()
-            status_text.empty()
-            error_msg = str(e)
-            if "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
-                st.error(f"⏱️ Timeout Error: {error_msg}")
-                st.warning("💡 Tip: Try simplifying your request, reducing file sizes, or increasing the TIMEOUT_SECONDS in your environment/.env file.")
-            else:
-                st.error(f"Error during processing: {error_msg}")
-                st.exception(e)
+        # Start a new session if follow-up mode is on and there's none for the selected files
+        if keep_session:
+            if analysis_session is not None and sorted(analysis_session.file_paths) != sorted(all_selected_files):
+                close_analysis_session(analysis_session.session_id)
+                analysis_session = None
+            if analysis_session is None:
+                analysis_session = get_session_manager().create(all_selected_files)
+                st.session_state.analysis_session_id = analysis_session.session_id
+        elif analysis_session is not None:
+            close_analysis_session(analysis_session.session_id)
+            st.session_state.analysis_session_id = None
+            analysis_session = None
+        
+        st.session_state.analysis_jobs.append(
+            submit_analysis_job(prompt, all_selected_files, timeout_seconds, session=analysis_session)
+        )
+
+if st.session_state.analysis_jobs:
+    show_analysis_jobs()
 
-# Display conversation history
-if st.session_state.messages:
+# Display conversation history (stored on disk; older answers are only loaded when their expander is opened)
+history_limit = st.session_state.get("history_limit", HISTORY_PAGE_SIZE)
+history = get_conversation_store().list(st.session_state.conversation_id, limit=history_limit + 2)
+if history:
     st.header("📝 Generated Responses")
     
-    reversed_messages = list(reversed(st.session_state.messages[-5:]))  # Show last 5 responses
+    # Most recent answer - show normally (not collapsed)
+    st.subheader("✨ Current Answer")
+    show_stored_message(history[0]["message_id"], history[0]["message_id"][:12])
     
-    for i, msg in enumerate(reversed_messages):
-        # Get message data (handle both old and new format)
-        prompt_text = msg.get('prompt', '')
-        main_answer = msg.get('main_answer', msg.get('response', ''))
-        intermediate_steps = msg.get('intermediate_steps', '')
-        generated_files = msg.get('files', [])
-        answer_file = msg.get('answer_file', None)
-        
-        # Combine all output files (generated files + answer file)
-        all_output_files = generated_files.copy()
-        if answer_file and answer_file not in all_output_files:
-            all_output_files.append(answer_file)
-        
-        # Check if summary file exists and should be shown first
-        has_summary = answer_file and os.path.basename(answer_file).startswith('summary_')
-        
-        # For the most recent answer (i == 0), show it normally
-        # For previous answers (i > 0), show them in collapsible expanders
-        if i > 0:
-            # Previous answers - show in collapsible expander
-            # Truncate prompt for display if too long
-            display_prompt = prompt_text[:60] + "..." if len(prompt_text) > 60 else prompt_text
-            with st.expander(f"📜 Previous Answer: {display_prompt}", expanded=False):
-                st.markdown(f"**Prompt:** {prompt_text}")
-                st.markdown("---")
-                
-                # Create tabs - put Summary first if available, otherwise Main Answer
-                if has_summary:
-                    tab1, tab2, tab3 = st.tabs(["📋 Summary", "🔍 Intermediate Steps", "📊 Generated Files"])
-                else:
-                    tab1, tab2, tab3 = st.tabs(["✨ Main Answer", "🔍 Intermediate Steps", "📊 Generated Files"])
-                
-                with tab1:
-                    # Display main answer
-                    st.markdown(main_answer)
-                    
-                    # Show answer file info and download
-                    if answer_file and os.path.exists(answer_file):
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.success(f"✅ Answer saved to: `{os.path.basename(answer_file)}`")
-                        with col2:
-                            with open(answer_file, "rb") as f:
-                                st.download_button(
-                                    label="📥 Download Answer",
-                                    data=f.read(),
-                                    file_name=os.path.basename(answer_file),
-                                    mime="text/plain",
-                                    key=f"download_answer_{i}"
-                                )
-                
-                with tab2:
-                    # Display intermediate steps in scrolled window
-                    if intermediate_steps and intermediate_steps != main_answer:
-                        st.markdown("**Execution Details:**")
-                        st.text_area(
-                            "Intermediate steps and execution logs",
-                            value=intermediate_steps,
-                            height=500,
-                            key=f"intermediate_{i}",
-                            label_visibility="collapsed",
-                            disabled=True  # Make it read-only and scrollable
-                        )
-                    else:
-                        st.info("No intermediate steps available.")
-                
-                with tab3:
-                    # Generated Files tab with file viewer
-                    if all_output_files:
-                        # Create file name tabs at the top
-                        file_tabs = st.tabs([os.path.basename(f) for f in all_output_files])
-                        
-                        for tab_idx, file_path in enumerate(all_output_files):
-                            with file_tabs[tab_idx]:
-                                if os.path.exists(file_path):
-                                    # Check if it's a text file (answer file)
-                                    if file_path.endswith('.txt'):
-                                        # Display text file content
-                                        with open(file_path, "r", encoding="utf-8") as f:
-                                            file_content = f.read()
-                                        
-                                        st.markdown("**File Content:**")
-                                        st.text_area(
-                                            "File content",
-                                            value=file_content,
-                                            height=400,
-                                            key=f"text_viewer_{file_path}_{i}",
-                                            label_visibility="collapsed"
-                                        )
-                                        
-                                        # Download button for text file
-                                        with open(file_path, "rb") as f:
-                                            st.download_button(
-                                                label="📥 Download Text File",
-                                                data=f.read(),
-                                                file_name=os.path.basename(file_path),
-                                                mime="text/plain",
-                                                key=f"download_text_{file_path}_{i}"
-                                            )
-                                    
-                                    # Check if it's a dataframe file
-                                    elif file_path in st.session_state.processed_dataframes:
-                                        # Get sheet names for this file
-                                        sheet_names = get_sheet_names(file_path)
-                                        
-                                        # Show sheet selection buttons if multiple sheets
-                                        if sheet_names and len(sheet_names) > 1:
-                                            st.markdown("**Select Sheet:**")
-                                            # Create buttons for each sheet
-                                            cols = st.columns(min(len(sheet_names), 5))  # Max 5 columns
-                                            for idx, sheet_name in enumerate(sheet_names):
-                                                with cols[idx % len(cols)]:
-                                                    button_key = f"sheet_btn_{file_path}_{sheet_name}_{i}"
-                                                    is_selected = st.session_state.selected_sheets.get(file_path) == sheet_name
-                                                    if st.button(
-                                                        sheet_name,
-                                                        key=button_key,
-                                                        type="primary" if is_selected else "secondary",
-                                                        use_container_width=True
-                                                    ):
-                                                        st.session_state.selected_sheets[file_path] = sheet_name
-                                                        st.rerun()
-                                        
-                                        # Get current dataframe (handles multi-sheet)
-                                        df = get_current_dataframe(file_path)
-                                        
-                                        if df is not None and not df.empty:
-                                            # Show current sheet name if multi-sheet
-                                            if sheet_names and len(sheet_names) > 1:
-                                                current_sheet = st.session_state.selected_sheets.get(file_path, sheet_names[0])
-                                                st.markdown(f"**Current Sheet: {current_sheet}**")
-                                            
-                                            # File info
-                                            col1, col2, col3 = st.columns(3)
-                                            with col1:
-                                                st.metric("Rows", len(df))
-                                            with col2:
-                                                st.metric("Columns", len(df.columns))
-                                            with col3:
-                                                st.metric("File Size", f"{os.path.getsize(file_path) / 1024:.2f} KB")
-                                            
-                                            # DataFrame display
-                                            st.dataframe(df, use_container_width=True)
-                                            
-                                            # Download button
-                                            if file_path.endswith('.csv'):
-                                                csv = df.to_csv(index=False).encode('utf-8')
-                                                st.download_button(
-                                                    label="📥 Download CSV",
-                                                    data=csv,
-                                                    file_name=os.path.basename(file_path),
-                                                    mime="text/csv",
-                                                    key=f"download_csv_{file_path}_{i}"
-                                                )
-                                            else:
-                                                # For Excel, we'll use the existing file
-                                                with open(file_path, "rb") as f:
-                                                    st.download_button(
-                                                        label="📥 Download Excel",
-                                                        data=f.read(),
-                                                        file_name=os.path.basename(file_path),
-                                                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                                        key=f"download_excel_{file_path}_{i}"
-                                                    )
-                                        else:
-                                            st.warning("No data available to display.")
-                                    else:
-                                        # Try to read as dataframe if not in cache (skip text files)
-                                        if not file_path.endswith('.txt'):
-                                            try:
-                                                data = read_excel_or_csv(file_path)
-                                                if isinstance(data, dict):
-                                                    # Excel file with multiple sheets
-                                                    st.session_state.processed_dataframes[file_path] = data
-                                                    # Set default selected sheet to first sheet
-                                                    if file_path not in st.session_state.selected_sheets:
-                                                        st.session_state.selected_sheets[file_path] = list(data.keys())[0] if data else None
-                                                    st.rerun()
-                                                elif isinstance(data, pd.DataFrame) and not data.empty:
-                                                    st.session_state.processed_dataframes[file_path] = data
-                                                    st.rerun()
-                                                else:
-                                                    st.warning("Could not read file as dataframe.")
-                                            except:
-                                                st.warning("File type not supported for preview. You can still download it.")
-                                                with open(file_path, "rb") as f:
-                                                    st.download_button(
-                                                        label="📥 Download File",
-                                                        data=f.read(),
-                                                        file_name=os.path.basename(file_path),
-                                                        mime="application/octet-stream",
-                                                        key=f"download_file_{file_path}_{i}"
-                                                    )
-                                        else:
-                                            st.warning("Text files are displayed in the text viewer above.")
-                                else:
-                                    st.warning(f"File not found: {os.path.basename(file_path)}")
-                    else:
-                        st.info("No generated files available.")
-        else:
-            # Most recent answer - show normally (not collapsed)
-            st.subheader("✨ Current Answer")
-            st.markdown(f"**Prompt:** {prompt_text}")
-            st.markdown("---")
-            
-            # Create tabs - put Summary first if available, otherwise Main Answer
-            if has_summary:
-                tab1, tab2, tab3 = st.tabs(["📋 Summary", "🔍 Intermediate Steps", "📊 Generated Files"])
-            else:
-                tab1, tab2, tab3 = st.tabs(["✨ Main Answer", "🔍 Intermediate Steps", "📊 Generated Files"])
-            
-            with tab1:
-                # Display main answer
-                st.markdown(main_answer)
-                
-                # Show answer file info and download
-                if answer_file and os.path.exists(answer_file):
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.success(f"✅ Answer saved to: `{os.path.basename(answer_file)}`")
-                    with col2:
-                        with open(answer_file, "rb") as f:
-                            st.download_button(
-                                label="📥 Download Answer",
-                                data=f.read(),
-                                file_name=os.path.basename(answer_file),
-                                mime="text/plain",
-                                key=f"download_answer_{i}"
-                            )
-            
-            with tab2:
-                # Display intermediate steps in scrolled window
-                if intermediate_steps and intermediate_steps != main_answer:
-                    st.markdown("**Execution Details:**")
-                    st.text_area(
-                        "Intermediate steps and execution logs",
-                        value=intermediate_steps,
-                        height=500,
-                        key=f"intermediate_{i}",
-                        label_visibility="collapsed",
-                        disabled=True  # Make it read-only and scrollable
-                    )
-                else:
-                    st.info("No intermediate steps available.")
-            
-            with tab3:
-                # Generated Files tab with file viewer
-                if all_output_files:
-                    # Create file name tabs at the top
-                    file_tabs = st.tabs([os.path.basename(f) for f in all_output_files])
-                    
-                    for tab_idx, file_path in enumerate(all_output_files):
-                        with file_tabs[tab_idx]:
-                            if os.path.exists(file_path):
-                                # Check if it's a text file (answer file)
-                                if file_path.endswith('.txt'):
-                                    # Display text file content
-                                    with open(file_path, "r", encoding="utf-8") as f:
-                                        file_content = f.read()
-                                    
-                                    st.markdown("**File Content:**")
-                                    st.text_area(
-                                        "File content",
-                                        value=file_content,
-                                        height=400,
-                                        key=f"text_viewer_{file_path}_{i}",
-                                        label_visibility="collapsed"
-                                    )
-                                    
-                                    # Download button for text file
-                                    with open(file_path, "rb") as f:
-                                        st.download_button(
-                                            label="📥 Download Text File",
-                                            data=f.read(),
-                                            file_name=os.path.basename(file_path),
-                                            mime="text/plain",
-                                            key=f"download_text_{file_path}_{i}"
-                                        )
-                                
-                                # Check if it's a dataframe file
-                                elif file_path in st.session_state.processed_dataframes:
-                                    # Get sheet names for this file
-                                    sheet_names = get_sheet_names(file_path)
-                                    
-                                    # Show sheet selection buttons if multiple sheets
-                                    if sheet_names and len(sheet_names) > 1:
-                                        st.markdown("**Select Sheet:**")
-                                        # Create buttons for each sheet
-                                        cols = st.columns(min(len(sheet_names), 5))  # Max 5 columns
-                                        for idx, sheet_name in enumerate(sheet_names):
-                                            with cols[idx % len(cols)]:
-                                                button_key = f"sheet_btn_{file_path}_{sheet_name}_{i}"
-                                                is_selected = st.session_state.selected_sheets.get(file_path) == sheet_name
-                                                if st.button(
-                                                    sheet_name,
-                                                    key=button_key,
-                                                    type="primary" if is_selected else "secondary",
-                                                    use_container_width=True
-                                                ):
-                                                    st.session_state.selected_sheets[file_path] = sheet_name
-                                                    st.rerun()
-                                    
-                                    # Get current dataframe (handles multi-sheet)
-                                    df = get_current_dataframe(file_path)
-                                    
-                                    if df is not None and not df.empty:
-                                        # Show current sheet name if multi-sheet
-                                        if sheet_names and len(sheet_names) > 1:
-                                            current_sheet = st.session_state.selected_sheets.get(file_path, sheet_names[0])
-                                            st.markdown(f"**Current Sheet: {current_sheet}**")
-                                        
-                                        # File info
-                                        col1, col2, col3 = st.columns(3)
-                                        with col1:
-                                            st.metric("Rows", len(df))
-                                        with col2:
-                                            st.metric("Columns", len(df.columns))
-                                        with col3:
-                                            st.metric("File Size", f"{os.path.getsize(file_path) / 1024:.2f} KB")
-                                        
-                                        # DataFrame display
-                                        st.dataframe(df, use_container_width=True)
-                                        
-                                        # Download button
-                                        if file_path.endswith('.csv'):
-                                            csv = df.to_csv(index=False).encode('utf-8')
-                                            st.download_button(
-                                                label="📥 Download CSV",
-                                                data=csv,
-                                                file_name=os.path.basename(file_path),
-                                                mime="text/csv",
-                                                key=f"download_csv_{file_path}_{i}"
-                                            )
-                                        else:
-                                            # For Excel, we'll use the existing file
-                                            with open(file_path, "rb") as f:
-                                                st.download_button(
-                                                    label="📥 Download Excel",
-                                                    data=f.read(),
-                                                    file_name=os.path.basename(file_path),
-                                                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                                    key=f"download_excel_{file_path}_{i}"
-                                                )
-                                    else:
-                                        st.warning("No data available to display.")
-                                else:
-                                    # Try to read as dataframe if not in cache (skip text files)
-                                    if not file_path.endswith('.txt'):
-                                        try:
-                                            data = read_excel_or_csv(file_path)
-                                            if isinstance(data, dict):
-                                                # Excel file with multiple sheets
-                                                st.session_state.processed_dataframes[file_path] = data
-                                                # Set default selected sheet to first sheet
-                                                if file_path not in st.session_state.selected_sheets:
-                                                    st.session_state.selected_sheets[file_path] = list(data.keys())[0] if data else None
-                                                st.rerun()
-                                            elif isinstance(data, pd.DataFrame) and not data.empty:
-                                                st.session_state.processed_dataframes[file_path] = data
-                                                st.rerun()
-                                            else:
-                                                st.warning("Could not read file as dataframe.")
-                                        except:
-                                            st.warning("File type not supported for preview. You can still download it.")
-                                            with open(file_path, "rb") as f:
-                                                st.download_button(
-                                                    label="📥 Download File",
-                                                    data=f.read(),
-                                                    file_name=os.path.basename(file_path),
-                                                    mime="application/octet-stream",
-                                                    key=f"download_file_{file_path}_{i}"
-                                                )
-                                    else:
-                                        st.warning("Text files are displayed in the text viewer above.")
-                            else:
-                                st.warning(f"File not found: {os.path.basename(file_path)}")
-                else:
-                    st.info("No generated files available.")
-        
-        # Add separator only if not the last message
-        if i < len(reversed_messages) - 1:
-            st.markdown("---")
+    # Previous answers - collapsed, newest first
+    for summary in history[1:history_limit + 1]:
+        st.markdown("---")
+        show_previous_message(summary)
+    
+    if len(history) > history_limit + 1:
+        if st.button("Show older answers", key="history_more"):
+            st.session_state.history_limit = history_limit + HISTORY_PAGE_SIZE
+            st.rerun()
+
+# Snapshot the session (only written when it changed) so a restart or reconnect restores it without re-parsing
+try:
+    save_snapshot(st.session_state.conversation_id, {key: st.session_state[key] for key in SNAPSHOT_KEYS},
+                  st.session_state.processed_dataframes)
+except (OSError, ValueError):
+    pass
 
 # Footer
 